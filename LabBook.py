@@ -4,23 +4,23 @@
 import getopt
 import os
 import sys
-import traceback
 import exitstatus
 
-import LbkTests
+import LbkTrace
 
 from LbkIO          import Opt
 from LbkIO          import Mode
+from LbkIO          import Flag
 from LbkIO          import LbkIO
-from LbkFuncs       import LbkFuncs
 
 from LbkExceptions  import ModeExcept
 from LbkExceptions  import IOModeExcept
 from LbkExceptions  import IODateExcept
 from LbkExceptions  import IODatesExcept
+from LbkExceptions  import IOFlagExcept
 
-def main(argv):
-    """main LabBook function"""
+def main(argv, daemon=None):
+    """main LabBook function, daemon being the LbkDaemon running it if any"""
 
     lbkIO = LbkIO()
 
@@ -28,7 +28,8 @@ def main(argv):
     try:
         getOpts, getArgs = getopt.getopt( argv,
                             'hv'+':'.join([opt.name[0] for opt in Opt])+':',
-                            ['help','version']+[opt.name+'=' for opt in Opt] )
+                            ['help','version']+[opt.name+'=' for opt in Opt]
+                            + lbkIO.getFlagOpts() )
 
     except getopt.GetoptError as e:
         print(e)
@@ -37,6 +38,7 @@ def main(argv):
 
     # converting options ----------------------------------------------------- #
     optargs = {}
+    flags = {}
     for getOpt, getArg in getOpts:
         
         # converting option
@@ -52,22 +54,37 @@ def main(argv):
             lbkIO.info_version()
             sys.exit(exitstatus.ExitStatus.success)
 
+        # converting flag
+        flag = lbkIO.str2flag(getOpt[2:]) if getOpt[0:2]=='--' else None
+        if flag is not None:
+            
+            parser = lbkIO.getFlagParser(flag)
+            try:
+                flags[flag] = parser(getArg) if parser else True
+
+            except IOFlagExcept as e:
+                e.info()
+                sys.exit(exitstatus.ExitStatus.failure)
+
+            continue
+
         opt =   Opt[getOpt[2:]]   if getOpt[0:2]=='--'\
                 else Opt([opt.name[0] for opt in Opt].index(getOpt[1:]))
         
         # converting argument
         try:
-            arg = lbkIO.str2date(getArg)
+            arg = lbkIO.str2opt(opt, getArg)
 
-        except IODateExcept as e:
+        except (IODateExcept, IODatesExcept) as e:
             e.info()
             sys.exit(exitstatus.ExitStatus.failure)
 
         # output
         optargs[opt] = arg
 
-    # converting argument ---------------------------------------------------- #
-    if not(len(getArgs) == 1):
+    # converting argument, batch and search modes being followed by others --- #
+    if len(getArgs) == 0 or \
+       (len(getArgs) > 1 and getArgs[0] not in ['batch', 'search']):
         print("LabBook takes only one argument.")
         lbkIO.usage()
         exit(exitstatus.ExitStatus.failure)
@@ -87,18 +104,50 @@ def main(argv):
     
     try :
         startDate, endDate = getDates(optargs)
+        lbkIO.checkFlags(mode, flags)
+        if mode is Mode.batch:
+            lbkIO.checkBatch(getArgs[1:], optargs, flags)
+        if mode is Mode.search:
+            lbkIO.checkSearch(getArgs[1:])
 
     # except (InitException, CleanException) as e:
-    except (IOModeExcept, IODatesExcept) as e:
+    except (IOModeExcept, IODatesExcept, IOFlagExcept) as e:
         e.info()
         exit(exitstatus.ExitStatus.failure)
 
-    # calling main function -------------------------------------------------- #
-    lbkFuncs = LbkFuncs()
-    func = lbkFuncs.getFunc(mode)
+    # running command in project daemon if any ------------------------------- #
+    if daemon is None:
+
+        import LbkDaemon
+
+        status = LbkDaemon.forward(argv) if mode.name in LbkDaemon.modes \
+                 else None
+        if status is not None:
+            if status != 0:
+                exit(status)
+            return exitstatus.ExitStatus.success
 
+    # tracing and profiling of main function ---------------------------------- #
+    if Flag.trace in flags:
+        LbkTrace.start()
+
+    profiler = None
+    if Flag.profile in flags:
+        import cProfile
+        profiler = cProfile.Profile()
+        profiler.enable()
+
+    # calling main function, loaded once mode is known ----------------------- #
     try :
-        func(startDate, endDate)
+        with LbkTrace.span(mode.name, 'mode'):
+
+            with LbkTrace.span('import', 'mode'):
+                from LbkFuncs import LbkFuncs
+
+            lbkFuncs = LbkFuncs(flags, daemon.lbkTools if daemon else None,
+                                args=getArgs[1:])
+            func = lbkFuncs.getFunc(mode)
+            func(startDate, endDate)
 
     except ModeExcept as e:
         e.info()
@@ -107,9 +156,18 @@ def main(argv):
     except Exception as e:
         print("unknown internal error")
         print(e)
-        #traceback.print_exc()
         exit(exitstatus.ExitStatus.failure)
 
+    # saved even when main function fails
+    finally:
+        if profiler:
+            profiler.disable()
+            profiler.dump_stats(flags[Flag.profile])
+            print("> Profile saved in " + flags[Flag.profile] + ".")
+        if Flag.trace in flags:
+            LbkTrace.stop(flags[Flag.trace])
+            print("> Trace saved in " + flags[Flag.trace] + ".")
+
     return exitstatus.ExitStatus.success
 
 # Main ======================================================================= #
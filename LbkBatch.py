@@ -0,0 +1,107 @@
+#! /usr/local/bin/python3
+# -*- coding: utf-8 -*-
+
+import collections
+import concurrent.futures
+import contextlib
+import glob
+import io
+import os
+import time
+
+from LbkExceptions import ModeExcept
+from LbkExceptions import DoNothingExcept
+
+# status, wall time in seconds and output of a command on one project
+LbkBatchResult = collections.namedtuple('LbkBatchResult',
+                                        ['root', 'status', 'wall', 'output'])
+
+# Worker ===================================================================== #
+
+def preload():
+    """import features once per worker process"""
+
+    import LbkFuncs
+    import LbkCompiler
+
+def runProject(root, mode, startDate, endDate, flags):
+    """run command on one project within a worker, its output being
+       captured"""
+
+    from LbkFuncs import LbkFuncs
+
+    output = io.StringIO()
+    start = time.perf_counter()
+
+    with contextlib.redirect_stdout(output):
+        try:
+            LbkFuncs(flags, None, root).getFunc(mode)(startDate, endDate)
+            status = 'ok'
+
+        except DoNothingExcept as e:
+            e.info()
+            status = 'skip'
+
+        except ModeExcept as e:
+            e.info()
+            status = 'fail'
+
+        except Exception as e:
+            print("unknown internal error")
+            print(e)
+            status = 'fail'
+
+    return LbkBatchResult(root, status, time.perf_counter() - start,
+                          output.getvalue())
+
+# Batch ====================================================================== #
+
+class LbkBatch:
+    """command run on many projects by a pool of worker processes"""
+
+    def __init__(self, jobs=None):
+        """LbkBatch class constructor"""
+
+        # worker processes
+        self.jobs = jobs if jobs else os.cpu_count() or 1
+
+    @staticmethod
+    def expand(patterns):
+        """get project folders matching folder names or glob patterns, in
+           order and once each, and patterns matching no project"""
+
+        roots, unmatched = [], []
+        for pattern in patterns:
+
+            found = [ os.path.abspath(path) for path in
+                      sorted(glob.glob(os.path.expanduser(pattern)))
+                      if os.path.isfile(os.path.join(path, 'param.lbk')) ]
+            if not found:
+                unmatched.append(pattern)
+
+            roots += [ root for root in found if root not in roots ]
+
+        return roots, unmatched
+
+    def run(self, roots, mode, startDate, endDate, flags):
+        """run command on every project, return results in roots order"""
+
+        results = {}
+        with concurrent.futures.ProcessPoolExecutor(
+                min(self.jobs, len(roots)), initializer=preload) as executor:
+
+            futures = { executor.submit(runProject, root, mode, startDate,
+                                        endDate, flags): root
+                        for root in roots }
+
+            for future in concurrent.futures.as_completed(futures):
+                root = futures[future]
+                try:
+                    results[root] = future.result()
+
+                # worker killed or unpicklable result
+                except Exception as e:
+                    results[root] = LbkBatchResult(root, 'fail', 0.0,
+                                                   str(e) + os.linesep)
+
+        return [ results[root] for root in roots ]
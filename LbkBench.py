@@ -0,0 +1,218 @@
+#! /usr/local/bin/python3
+# -*- coding: utf-8 -*-
+
+import contextlib
+import datetime
+import io
+import json
+import os
+import platform
+import shutil
+import subprocess
+import tempfile
+import time
+
+import LbkTrace
+
+from LbkFuncs import LbkFuncs
+from LbkTools import LbkTools
+from LbkIO    import Flag
+
+class LbkBench:
+    """benchmark of LabBook features on a synthetic project"""
+
+    # first day of synthetic projects
+    firstDate = datetime.date(2000, 1, 1)
+
+    def __init__(self, years=1, figures=0, lines=20, repeat=3, echo=print):
+        """LbkBench class constructor"""
+
+        # years of daily entries
+        self.years = years
+        # figures per entry
+        self.figures = figures
+        # text lines per log
+        self.lines = lines
+        # runs of repeatable timings, best one is kept
+        self.repeat = repeat
+        # current module directory
+        self.cmd = os.path.dirname(os.path.abspath(__file__))
+        # timings in seconds
+        self.timings = {}
+        # output function
+        self.echo = echo
+
+    def time(self, name, func, repeat=1):
+        """time func silently, keep best of repeat runs"""
+
+        best = None
+        for i in range(repeat):
+
+            with contextlib.redirect_stdout(io.StringIO()):
+                start = time.perf_counter()
+                func()
+                elapsed = time.perf_counter() - start
+
+            best = elapsed if best is None else min(best, elapsed)
+
+        self.timings[name] = best
+        self.echo("> " + name + " " + (22 - len(name)) * "." + " " +
+                  self.ms(best) + ".")
+
+    @staticmethod
+    def ms(seconds):
+        """format seconds in milliseconds"""
+
+        return '{:.1f} ms'.format(1000 * seconds)
+
+    def endDate(self):
+        """day after last entry of synthetic project"""
+
+        return self.firstDate.replace(year=self.firstDate.year + self.years)
+
+    def fill(self, lbkTools):
+        """write synthetic logs text and figures of every entry"""
+
+        text = ''.join([ 'Line ' + str(i) + ' of synthetic log entry, ' +
+                         'with some $x^2$ math and \\textbf{bold} text.' +
+                         os.linesep for i in range(self.lines) ])
+        figure = b'\x89PNG\r\n\x1a\n' + 56 * b'\0'
+
+        for date in lbkTools.getLogDates():
+
+            pathOS, pathLX = lbkTools.getLogPath(date)
+            with open(os.path.join(pathOS, 'log.tex'), 'a') as file:
+                file.write(text)
+                for i in range(self.figures):
+                    file.write('\\lbkFig{fig' + str(i) + '}{Figure ' + str(i) +
+                               '}' + os.linesep)
+
+            for i in range(self.figures):
+                with open(os.path.join(pathOS, 'figs', 'fig' + str(i) + '.png'),
+                          'wb') as file:
+                    file.write(figure)
+
+    def generate(self):
+        """create synthetic project in current directory"""
+
+        with contextlib.redirect_stdout(io.StringIO()):
+            LbkFuncs().init(None, None)
+
+        # build with stub compiler without TeX installation
+        lbkTools = LbkTools(os.path.join(os.getcwd(), 'tpl'), os.getcwd())
+        keyValues = lbkTools.openJsonFile('param.lbk')
+        keyValues['LBKCOMPILER'] = 'stub'
+        lbkTools.saveJsonFile(keyValues, 'param.lbk')
+
+        self.time('new', lambda: LbkFuncs().new(self.firstDate, self.endDate()))
+        self.fill(lbkTools)
+
+    def run(self):
+        """generate project in a temporary folder and time main features"""
+
+        cwd = os.getcwd()
+        tmpDir = tempfile.mkdtemp(prefix='lbkbench-')
+
+        try:
+            os.chdir(tmpDir)
+            self.generate()
+
+            def getLogDates(scan):
+                if scan:
+                    os.remove(os.path.join('.lbk', 'index.json'))
+                LbkTools(os.path.join(tmpDir, 'tpl'), tmpDir).getLogDates()
+
+            lbkTools = LbkTools(os.path.join(tmpDir, 'tpl'), tmpDir)
+            dates = lbkTools.getLogDates()
+            keyValues = lbkTools.openJsonFile('param.lbk')
+            lbkFuncs = LbkFuncs()
+
+            self.time('getLogDates scan', lambda: getLogDates(True), self.repeat)
+            self.time('getLogDates', lambda: getLogDates(False), self.repeat)
+            self.time('renew', lambda: LbkFuncs().renew(None, None))
+            self.time('renew up to date', lambda: LbkFuncs().renew(None, None))
+            self.time('render headers',
+                      lambda: [ lbkTools.renderHeader(date,
+                                                      lbkTools.getLogPath(date)[1])
+                                for date in dates ], self.repeat)
+            self.time('main file', lambda: lbkFuncs.mainData(dates, keyValues),
+                      self.repeat)
+            self.time('make', lambda: LbkFuncs().make(None, None))
+            self.time('make up to date', lambda: LbkFuncs().make(None, None))
+            self.time('clean', lambda: LbkFuncs({Flag.deep: True}).clean(None,
+                                                                         None))
+
+        finally:
+            os.chdir(cwd)
+            shutil.rmtree(tmpDir, ignore_errors=True)
+
+        return self.results(len(dates))
+
+    def revision(self):
+        """get git revision of LabBook sources or None"""
+
+        try:
+            with LbkTrace.span('git', 'subprocess'):
+                return subprocess.run( ['git', 'rev-parse', '--short', 'HEAD'],
+                                       cwd=self.cmd, stdout=subprocess.PIPE,
+                                       stderr=subprocess.DEVNULL,
+                                       universal_newlines=True,
+                                       check=True ).stdout.strip()
+        except (OSError, subprocess.CalledProcessError):
+            return None
+
+    def results(self, entries):
+        """machine-readable benchmark results"""
+
+        return { 'version': 1,
+                 'revision': self.revision(),
+                 'python': platform.python_version(),
+                 'date': datetime.datetime.now().isoformat(timespec='seconds'),
+                 'params': { 'years': self.years,
+                             'figures': self.figures,
+                             'lines': self.lines,
+                             'entries': entries },
+                 'timings': dict(self.timings) }
+
+    @staticmethod
+    def save(results, path):
+        """save results within a JSON file"""
+
+        with open(path, 'w') as file:
+            json.dump(results, file, indent=4, separators=(',', ': '))
+
+    @staticmethod
+    def load(path):
+        """load results saved by a previous run, None if unreadable"""
+
+        try:
+            with open(path) as file:
+                results = json.load(file)
+
+        except (OSError, ValueError):
+            return None
+
+        if not isinstance(results, dict) or \
+           not isinstance(results.get('timings'), dict):
+            return None
+
+        return results
+
+    def compare(self, base, results):
+        """print ratio of timings to base results"""
+
+        self.echo("> Compare with " + str(base.get('revision')) + " ... ",
+                  end="")
+        if base.get('params') != results['params']:
+            self.echo("warning, projects differ.")
+        else:
+            self.echo("ok.")
+
+        for name, elapsed in results['timings'].items():
+
+            baseElapsed = base['timings'].get(name)
+            if not baseElapsed:
+                continue
+            self.echo("  " + name + " " + (22 - len(name)) * "." + " " +
+                      self.ms(elapsed) + " (base " + self.ms(baseElapsed) +
+                      ", x" + '{:.2f}'.format(elapsed / baseElapsed) + ")")
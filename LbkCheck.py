@@ -0,0 +1,253 @@
+#! /usr/local/bin/python3
+# -*- coding: utf-8 -*-
+
+import collections
+import concurrent.futures
+import datetime
+import os
+import re
+
+from LbkTrace import traced
+
+# problem found in a log entry, level being error or warning
+LbkProblem = collections.namedtuple('LbkProblem',
+                                    ['date', 'line', 'level', 'message'])
+
+class LbkCheck:
+    """labels, references and figures of log entries checked without
+       compiling, usages of each log file being cached in .lbk/check.json"""
+
+    # cache format, older ones are rescanned
+    version = 1
+    # LaTeX comments, dropped before scanning
+    comment = re.compile(r'(?<!\\)%.*$', re.MULTILINE)
+    # usages, in order of appearance
+    usage = re.compile(r'\\(?:'
+                       r'(?P<label>label)|'
+                       r'(?P<ref>(?:eq|page|auto|name|c|C)?ref)\*?|'
+                       r'(?P<lbkRef>lbkRef)|'
+                       r'(?P<lbkFig>lbkFig)\s*(?:\[[^\]]*\])?|'
+                       r'(?P<graphics>includegraphics)\*?\s*(?:\[[^\]]*\])*'
+                       r')\s*\{(?P<arg>[^}]*)\}')
+    # files found by graphicx when no extension is given, in its order
+    extensions = ['.png', '.pdf', '.jpg', '.mps', '.jpeg', '.jbig2', '.jb2',
+                  '.PNG', '.PDF', '.JPG', '.JPEG', '.JBIG2', '.JB2', '.eps']
+
+    def __init__(self, lbkTools):
+        """LbkCheck class constructor"""
+
+        # LbkTools instance of project
+        self.lbkTools = lbkTools
+        # usages and stat of log file when scanned, by entry key
+        self.entries = {}
+        # entries scanned since loaded
+        self.scanned = 0
+        # folder listings, by folder relative to project
+        self.listings = {}
+
+    @staticmethod
+    def stamp(date):
+        """value of \\lbkDate for an entry, see LbkTools.renderHeader"""
+
+        return date.strftime('%Y%m%d')
+
+    @classmethod
+    def scan(cls, text, stamp):
+        """usages of a log file text as lists of [argument, line] for
+           labels, references, figures and graphics, the section label of
+           header being included"""
+
+        text = cls.comment.sub('', text)
+        usages = { 'labels': [['sec:' + stamp, 0]], 'refs': [],
+                   'figs': [], 'graphics': [] }
+
+        line, position = 1, 0
+        for match in cls.usage.finditer(text):
+
+            line += text.count('\n', position, match.start())
+            position = match.start()
+            arg = match.group('arg').strip().replace('\\lbkDate', stamp)
+
+            # arguments built by other macros cannot be resolved
+            if not arg or '\\' in arg or '#' in arg:
+                continue
+
+            if match.group('label'):
+                usages['labels'].append([arg, line])
+            elif match.group('ref'):
+                usages['refs'] += [ [key.strip(), line]
+                                    for key in arg.split(',') if key.strip() ]
+            elif match.group('lbkRef'):
+                usages['refs'].append([arg + '_' + stamp, line])
+            elif match.group('lbkFig'):
+                usages['labels'].append(['fig:' + arg + '_' + stamp, line])
+                usages['figs'].append([arg, line])
+            else:
+                usages['graphics'].append([arg, line])
+
+        return usages
+
+    @traced()
+    def load(self):
+        """load cached usages from project cache"""
+
+        cache = self.lbkTools.openCache('check.json')
+        if cache.get('version') == self.version:
+            self.entries = cache.get('entries', {})
+
+    def save(self):
+        """save cached usages to project cache"""
+
+        self.lbkTools.saveCache('check.json', { 'version': self.version,
+                                                'entries': self.entries })
+
+    def scanOne(self, date):
+        """usages of log file of an entry, scanned again only if its mtime
+           or size changed, None if unreadable"""
+
+        key = str(date.toordinal())
+        pathOS, pathLX = self.lbkTools.getLogPath(date)
+        path = os.path.join(self.lbkTools.cwd, pathOS, 'log.tex')
+
+        try:
+            stat = os.stat(path)
+            cached = self.entries.get(key)
+            if cached and cached['stat'] == [stat.st_mtime_ns, stat.st_size]:
+                return key, cached, False
+
+            with open(path, errors='replace') as file:
+                usages = self.scan(file.read(), self.stamp(date))
+
+        except OSError:
+            return key, None, False
+
+        usages['stat'] = [stat.st_mtime_ns, stat.st_size]
+        return key, usages, True
+
+    @traced()
+    def update(self, dates, jobs=1):
+        """scan log files of dates changed since cached, in parallel"""
+
+        if jobs > 1 and len(dates) > 1:
+            with concurrent.futures.ThreadPoolExecutor(jobs) as executor:
+                results = list(executor.map(self.scanOne, dates))
+        else:
+            results = [ self.scanOne(date) for date in dates ]
+
+        for key, usages, scanned in results:
+            if usages is None:
+                self.entries.pop(key, None)
+            elif scanned:
+                self.entries[key] = usages
+                self.scanned += 1
+
+    def prune(self, dates):
+        """forget entries not in dates, being every entry of project, return
+           whether some were removed"""
+
+        keys = { str(date.toordinal()) for date in dates }
+        removed = [ key for key in self.entries if key not in keys ]
+        for key in removed:
+            del self.entries[key]
+        return bool(removed)
+
+    def listing(self, folder):
+        """names of files of a folder relative to project, listed once"""
+
+        if folder not in self.listings:
+            try:
+                self.listings[folder] = set(os.listdir(
+                                    os.path.join(self.lbkTools.cwd, folder)))
+            except OSError:
+                self.listings[folder] = set()
+        return self.listings[folder]
+
+    def resolve(self, path):
+        """files matching a graphics path relative to project, the first one
+           being used by LaTeX"""
+
+        folder, name = os.path.split(os.path.normpath(path))
+        names = self.listing(folder)
+        if name in names:
+            return [name]
+        return [ name + ext for ext in self.extensions if name + ext in names ]
+
+    def labels(self, keys):
+        """dates and lines defining each label of entries of keys"""
+
+        labels = {}
+        for key in keys:
+            date = datetime.date.fromordinal(int(key))
+            for label, line in self.entries[key]['labels']:
+                labels.setdefault(label, []).append((date, line))
+        return labels
+
+    def problems(self, dates, labels):
+        """dangling references, multiply defined labels and missing or
+           ambiguous figures of entries of dates, in order"""
+
+        problems = []
+        for date in dates:
+
+            usages = self.entries.get(str(date.toordinal()))
+            if usages is None:
+                continue
+            pathOS, pathLX = self.lbkTools.getLogPath(date)
+
+            for label, line in usages['labels']:
+                others = [ other for other in labels.get(label, [])
+                           if other != (date, line) ]
+                if others:
+                    problems.append(LbkProblem(date, line, 'warning',
+                                    "label " + label + " also defined on " +
+                                    others[0][0].strftime("%d/%m/%Y") +
+                                    " l." + str(others[0][1])))
+
+            for label, line in usages['refs']:
+                if label not in labels:
+                    problems.append(LbkProblem(date, line, 'error',
+                                    "undefined reference " + label))
+
+            graphics = [ (os.path.join(pathOS, 'figs', name), line)
+                         for name, line in usages['figs'] ] + \
+                       [ (path, line) for path, line in usages['graphics'] ]
+            for path, line in graphics:
+                found = self.resolve(path)
+                if not found:
+                    problems.append(LbkProblem(date, line, 'error',
+                                    "missing figure " + path))
+                elif len(found) > 1:
+                    problems.append(LbkProblem(date, line, 'warning',
+                                    "ambiguous figure " + path + " (" +
+                                    ", ".join(found) + ", first used)"))
+
+        return sorted(problems, key=lambda problem: problem[0:2])
+
+    @traced()
+    def check(self, dates, allDates, jobs=1):
+        """check entries of dates against labels of every entry of project
+           in allDates, return problems found"""
+
+        self.load()
+        self.update(dates, jobs)
+
+        # labels of other entries only scanned when some reference is not
+        # defined by selected entries
+        keys = [ str(date.toordinal()) for date in dates ]
+        keys = [ key for key in keys if key in self.entries ]
+        labels = self.labels(keys)
+        if len(dates) < len(allDates) and \
+           any( label not in labels for key in keys
+                for label, line in self.entries[key]['refs'] ):
+            self.update(allDates, jobs)
+            labels = self.labels( key for key in
+                                  (str(date.toordinal()) for date in allDates)
+                                  if key in self.entries )
+            pruned = self.prune(allDates)
+        else:
+            pruned = len(dates) == len(allDates) and self.prune(allDates)
+
+        if self.scanned or pruned:
+            self.save()
+
+        return self.problems(dates, labels)
@@ -0,0 +1,310 @@
+#! /usr/local/bin/python3
+# -*- coding: utf-8 -*-
+
+import collections
+import concurrent.futures
+import hashlib
+import os
+import re
+import signal
+import subprocess
+import threading
+
+import LbkTrace
+
+from LbkTrace import traced
+
+# result of a compilation
+LbkBuild = collections.namedtuple('LbkBuild', ['status', 'passes', 'errors',
+                                              'warnings', 'log', 'files'])
+
+# Compiler engines =========================================================== #
+
+class LbkEngine:
+    """LaTeX engine called once per pass"""
+
+    # engine reruns itself until cross-references are settled
+    converges = False
+
+    def __init__(self, name, draftOption=None):
+        """LbkEngine class constructor"""
+
+        # engine executable
+        self.name = name
+        # option of a pass writing auxiliary files only
+        self.draftOption = draftOption
+
+    def command(self, filename, outDir, draft=False):
+        """get command line compiling filename"""
+
+        command = [self.name, '-interaction=nonstopmode']
+        if outDir:
+            command.append('-output-directory=' + outDir)
+        if draft and self.draftOption:
+            command.append(self.draftOption)
+        return command + [filename]
+
+    def run(self, filename, outDir, cwd, logFile, timeout, draft=False):
+        """run one pass, return exit status or None on timeout"""
+
+        # engine started in its own process group, drivers like latexmk
+        # running LaTeX in child processes
+        process = subprocess.Popen( self.command(filename, outDir, draft),
+                                    cwd=cwd, stdin=subprocess.DEVNULL,
+                                    stdout=logFile, stderr=subprocess.STDOUT,
+                                    start_new_session=True )
+        try:
+            return process.wait(timeout=timeout)
+
+        except subprocess.TimeoutExpired:
+            try:
+                if hasattr(os, 'killpg'):
+                    os.killpg(process.pid, signal.SIGKILL)
+                else:
+                    process.kill()
+            except ProcessLookupError:
+                pass
+            process.wait()
+            return None
+
+class LbkLatexmkEngine(LbkEngine):
+    """latexmk driver rerunning pdflatex by itself"""
+
+    converges = True
+
+    def command(self, filename, outDir, draft=False):
+        """get command line compiling filename"""
+
+        command = [self.name, '-pdf', '-interaction=nonstopmode']
+        if outDir:
+            command.append('-outdir=' + outDir)
+        return command + [filename]
+
+class LbkStubEngine(LbkEngine):
+    """built-in engine writing fake output files without TeX"""
+
+    # minimal pdf file
+    pdfData = ( b'%PDF-1.4\n1 0 obj<</Type/Catalog/Pages 2 0 R>>endobj\n'
+                b'2 0 obj<</Type/Pages/Kids[]/Count 0>>endobj\n'
+                b'trailer<</Root 1 0 R>>\n%%EOF\n' )
+
+    def run(self, filename, outDir, cwd, logFile, timeout, draft=False):
+        """write auxiliary, log and pdf files of filename"""
+
+        base = os.path.join(cwd, outDir,
+                            os.path.splitext(os.path.basename(filename))[0])
+
+        with open(os.path.join(cwd, filename), 'r') as file:
+            includes = LbkCompiler.texInclude.findall(file.read())
+
+        # auxiliary files of main file and included logs
+        with open(base + '.aux', 'w') as file:
+            file.write('\\relax' + os.linesep)
+            for include in includes:
+                file.write('\\@input{' + include + '.aux}' + os.linesep)
+        for include in includes:
+            with open(os.path.join(cwd, outDir, include + '.aux'), 'w') as file:
+                file.write('\\relax' + os.linesep)
+
+        with open(base + '.log', 'w') as file:
+            file.write('This is LbkStub, ' + str(len(includes)) + 
+                       ' included log(s)' + os.linesep)
+        if not draft:
+            with open(base + '.pdf', 'wb') as file:
+                file.write(self.pdfData)
+
+        logFile.write('LbkStub: ' + filename + (' (draft)' if draft else '') +
+                      os.linesep)
+        return 0
+
+# available engines
+engines = {
+    'pdflatex' : LbkEngine('pdflatex', '-draftmode'),
+    'xelatex'  : LbkEngine('xelatex', '-no-pdf'),
+    'lualatex' : LbkEngine('lualatex', '-draftmode'),
+    'latexmk'  : LbkLatexmkEngine('latexmk'),
+    'stub'     : LbkStubEngine('stub'),
+}
+
+# Compiler =================================================================== #
+
+# global limit of concurrent compilations
+slots = threading.BoundedSemaphore(os.cpu_count() or 1)
+# compilations waiting for a slot
+executor = concurrent.futures.ThreadPoolExecutor(64)
+
+def resetAfterFork():
+    """give forked processes their own compilation threads and slots, those
+       of parent process being lost or held"""
+
+    global slots, executor
+    slots = threading.BoundedSemaphore(os.cpu_count() or 1)
+    executor = concurrent.futures.ThreadPoolExecutor(64)
+
+if hasattr(os, 'register_at_fork'):
+    os.register_at_fork(after_in_child=resetAfterFork)
+
+class LbkCompiler:
+    """LaTeX compilation rerun until cross-references are settled"""
+
+    # auxiliary files whose content drives reruns
+    auxExts = ['.aux', '.toc', '.lof']
+    # files written by engines next to the pdf file
+    outExts = [ '.aux', '.toc', '.lof', '.lot', '.log', '.out', '.pdf',
+                '.synctex.gz', '.fls', '.fdb_latexmk', '.xdv' ]
+    # auxiliary files of included logs
+    auxInput = re.compile(r'\\@input\{([^}]*)\}')
+    # included logs
+    texInclude = re.compile(r'\\include\{([^}]*)\}')
+    # log messages asking for another pass
+    rerunLog = re.compile(r'Rerun to get|Label\(s\) may have changed')
+    # log warnings and error line numbers
+    warningLog = re.compile(r'^(?:LaTeX|Package \S+|Class \S+|pdfTeX) [Ww]arning')
+    lineLog = re.compile(r'^l\.(\d+)')
+
+    def __init__(self, cwd, engine='pdflatex', timeout=None, maxPasses=5,
+                 jobs=None):
+        """LbkCompiler class constructor"""
+
+        # current working directory
+        self.cwd = cwd
+        # LaTeX engine
+        self.engine = engines[engine]
+        # timeout of one pass in seconds
+        self.timeout = timeout
+        # maximum number of passes
+        self.maxPasses = maxPasses
+        # limit of concurrent compilations of this compiler, global one if
+        # not given
+        self.slots = threading.BoundedSemaphore(jobs) if jobs else None
+
+    @traced()
+    def snapshot(self, base, outDir):
+        """get digests of main and included auxiliary files"""
+
+        digests = {}
+        paths = [ base + ext for ext in self.auxExts ]
+        while paths:
+
+            path = paths.pop()
+            try:
+                with open(os.path.join(self.cwd, outDir, path), 'rb') as file:
+                    data = file.read()
+            except OSError:
+                continue
+
+            digests[path] = hashlib.sha1(data).hexdigest()
+            if path.endswith('.aux'):
+                paths += [ name for name in
+                           self.auxInput.findall(data.decode('latin-1'))
+                           if name not in digests ]
+
+        return digests
+
+    def readLog(self, base, outDir):
+        """read LaTeX log of last pass"""
+
+        try:
+            with open(os.path.join(self.cwd, outDir, base + '.log'), 'r',
+                      errors='replace') as file:
+                return file.read()
+        except OSError:
+            return ''
+
+    def parseLog(self, text):
+        """extract errors and warnings from LaTeX log"""
+
+        errors, warnings = [], []
+        lines = text.splitlines()
+        for i, line in enumerate(lines):
+
+            if line.startswith('! '):
+                # error line number follows error message
+                error = line[2:]
+                for nextLine in lines[i+1:i+10]:
+                    match = self.lineLog.match(nextLine)
+                    if match:
+                        error += ' (line ' + match.group(1) + ')'
+                        break
+                errors.append(error)
+
+            elif self.warningLog.match(line):
+                warnings.append(line)
+
+        return errors, warnings
+
+    def submit(self, filename, outDir='', draft=False):
+        """compile asynchronously, return future of LaTeX build"""
+
+        return executor.submit(self.compile, filename, outDir, draft)
+
+    @traced()
+    def compile(self, filename, outDir='', draft=False):
+        """run engine until auxiliary files are stable, output is written
+           in a build log file, in draft passes known to be followed by
+           another one do not write pdf file"""
+
+        base = os.path.splitext(os.path.basename(filename))[0]
+        logPath = os.path.join(self.cwd, '.lbk', 'build', base + '.log')
+        os.makedirs(os.path.dirname(logPath), exist_ok=True)
+
+        # auxiliary files of included logs are written in output directory
+        with open(os.path.join(self.cwd, filename), 'r') as file:
+            includes = self.texInclude.findall(file.read())
+        if outDir:
+            for include in includes:
+                os.makedirs(os.path.join(self.cwd, outDir,
+                                         os.path.dirname(include)),
+                            exist_ok=True)
+
+        passes, status, failures, changed = 0, 0, [], False
+        with open(logPath, 'w') as logFile, self.slots or slots:
+
+            before = self.snapshot(base, outDir)
+            while passes < self.maxPasses:
+
+                passes += 1
+                logFile.write('=== pass ' + str(passes) + os.linesep)
+                logFile.flush()
+
+                # passes without auxiliary files yet or following a change of
+                # them are followed by another one
+                draftPass = draft and (not before or changed) and \
+                            passes < self.maxPasses
+                try:
+                    with LbkTrace.span(self.engine.name, 'subprocess',
+                                       file=filename, run=passes,
+                                       draft=draftPass):
+                        status = self.engine.run(filename, outDir, self.cwd,
+                                                 logFile, self.timeout,
+                                                 draftPass)
+                except OSError as e:
+                    status = -1
+                    failures.append(self.engine.name + ' not run: ' + str(e))
+                    break
+
+                if status is None:
+                    status = -1
+                    failures.append(self.engine.name + ' timed out after ' +
+                                    str(self.timeout) + ' s')
+                if status != 0 or self.engine.converges:
+                    break
+
+                # stop once auxiliary files are settled
+                after = self.snapshot(base, outDir)
+                if after == before and not draftPass and \
+                   not self.rerunLog.search(self.readLog(base, outDir)):
+                    break
+                changed = bool(before) and after != before
+                before = after
+
+        # files written by this build
+        files = [ os.path.join(outDir, base + ext) for ext in self.outExts ] + \
+                [ os.path.join(outDir, include + '.aux') for include in includes ]
+        files = [ os.path.normpath(file) for file in files
+                  if os.path.isfile(os.path.join(self.cwd, file)) ] + \
+                [ os.path.relpath(logPath, self.cwd) ]
+
+        errors, warnings = self.parseLog(self.readLog(base, outDir))
+        return LbkBuild(status, passes, failures + errors, warnings,
+                        os.path.relpath(logPath, self.cwd), files)
@@ -0,0 +1,199 @@
+#! /usr/local/bin/python3
+# -*- coding: utf-8 -*-
+
+import json
+import os
+import socket
+
+# socket path, relative to project folder to stay below unix path limit
+socketPath = os.path.join('.lbk', 'daemon.sock')
+
+# commands served by daemon
+modes = ['new', 'make', 'renew', 'clean', 'search', 'check']
+
+# Client ===================================================================== #
+
+def send(request):
+    """send request to daemon of current project, print its output and
+       return its exit status, None when no daemon answers"""
+
+    try:
+        client = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        client.connect(socketPath)
+    except OSError:
+        return None
+
+    answered = False
+    try:
+        with client, client.makefile('r') as replies:
+
+            client.sendall((json.dumps(request) + '\n').encode())
+
+            for line in replies:
+                answered = True
+                reply = json.loads(line)
+                if 'out' in reply:
+                    print(reply['out'], end='', flush=True)
+                if 'status' in reply:
+                    return reply['status']
+
+    # daemon stopping meanwhile
+    except OSError:
+        if not answered:
+            return None
+
+    print("Daemon connection lost.")
+    return 1
+
+def forward(argv):
+    """run command in daemon of current project, None when none is running"""
+
+    if not os.path.exists(socketPath):
+        return None
+    return send({'argv': argv})
+
+# Daemon ===================================================================== #
+
+class LbkReplies:
+    """file-like object sending printed output to client"""
+
+    def __init__(self, connection):
+        """LbkReplies class constructor"""
+
+        self.connection = connection
+
+    def write(self, text):
+
+        if text:
+            self.connection.sendall((json.dumps({'out': text}) + '\n').encode())
+        return len(text)
+
+    def flush(self):
+        pass
+
+class LbkDaemon:
+    """server running commands of one project with warm caches"""
+
+    def __init__(self, cwd):
+        """LbkDaemon class constructor"""
+
+        # warm state is loaded once, log index and templates are checked
+        # against file stats at every request
+        from LbkTools import LbkTools
+
+        # current working directory
+        self.cwd = cwd
+        # LbkTools instance shared by requests
+        self.lbkTools = LbkTools(os.path.join(cwd, 'tpl'), cwd)
+        # listening socket
+        self.server = None
+
+    def bind(self):
+        """listen on project socket, replacing a stale one"""
+
+        if send({'ping': True}) is not None:
+            raise OSError("a daemon is already running")
+        if os.path.exists(socketPath):
+            os.remove(socketPath)
+
+        os.makedirs(os.path.dirname(socketPath), exist_ok=True)
+        self.server = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        self.server.bind(socketPath)
+        self.server.listen(16)
+
+    def serve(self):
+        """answer requests one at a time until stopped"""
+
+        try:
+            while True:
+                connection = self.server.accept()[0]
+                with connection:
+                    if not self.handle(connection):
+                        break
+
+        finally:
+            self.close()
+
+    def close(self):
+        """stop listening so that clients run commands in process"""
+
+        if self.server.fileno() >= 0:
+            self.server.close()
+            if os.path.exists(socketPath):
+                os.remove(socketPath)
+
+    def handle(self, connection):
+        """run one request, return False to stop serving"""
+
+        try:
+            with connection.makefile('r') as requests:
+                request = json.loads(requests.readline())
+
+            if request.get('stop'):
+                self.close()
+                status, serving = 0, False
+            elif request.get('ping'):
+                status, serving = 0, True
+            else:
+                status, serving = self.run(request['argv'],
+                                           LbkReplies(connection)), True
+
+            connection.sendall((json.dumps({'status': status}) + '\n').encode())
+            return serving
+
+        # client left or sent garbage: keep serving others
+        except (OSError, ValueError, KeyError, TypeError):
+            return True
+
+    def run(self, argv, replies):
+        """run LabBook command with output sent to client, return exit
+           status"""
+
+        import contextlib
+        import LabBook
+
+        # daemon keeps project folder as working directory
+        os.chdir(self.cwd)
+
+        with contextlib.redirect_stdout(replies):
+            try:
+                LabBook.main(argv, self)
+            except SystemExit as e:
+                return e.code if isinstance(e.code, int) else 1
+        return 0
+
+    def detach(self):
+        """run daemon in background, return pid of daemon to parent"""
+
+        ready, notify = os.pipe()
+        pid = os.fork()
+
+        if pid:
+            # parent waits until daemon listens
+            os.close(notify)
+            with os.fdopen(ready, 'rb') as readyFile:
+                message = readyFile.read().decode()
+            if message != 'ok':
+                raise OSError(message or "daemon did not start")
+            return pid
+
+        # child leaves terminal session and serves
+        os.close(ready)
+        try:
+            os.setsid()
+            self.bind()
+            os.write(notify, b'ok')
+        except Exception as e:
+            os.write(notify, str(e).encode())
+            os._exit(1)
+        finally:
+            os.close(notify)
+
+        devnull = os.open(os.devnull, os.O_RDWR)
+        for fd in (0, 1, 2):
+            os.dup2(devnull, fd)
+
+        try:
+            self.serve()
+        finally:
+            os._exit(0)
@@ -23,6 +23,11 @@ class IODateExcept(Exception):
         print(12*" " + "- formats: d/m, d/m/yy, d/m/yyyy, ddmm, ddmmyy, ddmmyyyy")
         print(12*" " + "- current year is assumed if not specified")
         print(12*" " + "- separators: / . : , -")
+        print(12*" " + "- two-digit years from 69 are 19yy, others 20yy")
+        print(12*" " + "- months: yyyy-mm")
+        print(12*" " + "- periods: last-week, this-week, next-week, last-month,")
+        print(12*" " + "  this-month, next-month, last-year, this-year")
+        print(12*" " + "- ranges: <date>..<date>, bounds included")
 
 class IODatesExcept(Exception):
     """raise for date order exception"""
@@ -34,6 +39,15 @@ class IODatesExcept(Exception):
         print(" from " + self.args[0].strftime("%d/%m/%Y"), end="")
         print(" to " + endDate.strftime("%d/%m/%Y") + "!")
 
+# IO Flag exceptions ========================================================= #
+
+class IOFlagExcept(Exception):
+    """raise for invalid option without short form"""
+
+    def info(self):
+
+        print("Error: " + self.args[0] + ".")
+
 # IO Mode exceptions ========================================================= #
 
 class IOModeExcept(Exception):
@@ -54,9 +68,18 @@ class IOInitExcept(IOModeExcept):
         print("<init>    initialize a new labbook project:")
         print(12*" " + "- create a blank json file with main parameters")
         print(12*" " + "- create and populate folder with LaTeX templates")
+        print(12*" " + "- templates are cloned when file system allows it,")
+        print(12*" " + "  copied otherwise, so that projects edit their own")
         print(os.linesep, end="")
         print(10*" " + "usage:")
         print(12*" " + "> labbook init")
+        print(12*" " + "> labbook --store <dir> init          ", end="")
+        print("(templates taken from a store)")
+        print(12*" " + "> labbook --store <dir> --projects <file> init")
+        print(12*" " + "                                      ", end="")
+        print("(one project per CSV row or JSON item)")
+        print(10*" " + "projects file has a folder column, others being", end="")
+        print(" parameters such as LBKAUTHOR")
 
 
 class IOCleanExcept(IOModeExcept):
@@ -72,11 +95,16 @@ class IOCleanExcept(IOModeExcept):
     def help():
 
         print("<clean>   clean labbook project:")
-        print(12*" " + "- remove .aux, .toc, .lof, .log and .out files from logs")
-        print(12*" " + "- remove .tex and .pdf files from root")
+        print(12*" " + "- remove files recorded by builds")
+        print(12*" " + "- or remove .aux, .toc, .lof, .log and .out files from")
+        print(12*" " + "  logs and .tex and .pdf files from root if deep")
         print(os.linesep, end="")
         print(10*" " + "usage:")
         print(12*" " + "> labbook clean")
+        print(12*" " + "> labbook --deep clean                ", end="")
+        print("(scan whole project except figs folders)")
+        print(12*" " + "> labbook --dry-run clean             ", end="")
+        print("(report files without removing them)")
 
 
 class IONewExcept(IOModeExcept):
@@ -104,6 +132,9 @@ class IONewExcept(IOModeExcept):
         print("(from <date> to current day)")
         print(12*" " + "> labbook -s <date> -e <date> new    ", end="")
         print("(between dates, included)")
+        print(12*" " + "> labbook --days <days> -s <date> new")
+        print(12*" " + "                                     ", end="")
+        print("(only weekdays, weekends or days like mon,fri)")
 
 class IORenewExcept(IOModeExcept):
     """raise if mismatching argument and options exception in renew function"""
@@ -119,12 +150,16 @@ class IORenewExcept(IOModeExcept):
     def help():
 
         print("<renew>   renew template header for each log entry:")
-        print(12*" " + "- clean project")
-        print(12*" " + "- create new headers for each entry")
+        print(12*" " + "- create new headers for entries whose header changed")
+        print(12*" " + "- clean project and create all headers if forced")
         print(10*" " + "required when modifying LaTeX templates in main folder")
         print(os.linesep, end="")
         print(10*" " + "usage:")
         print(12*" " + "> labbook renew")
+        print(12*" " + "> labbook --jobs <n> renew            ", end="")
+        print("(with <n> parallel jobs)")
+        print(12*" " + "> labbook --force renew               ", end="")
+        print("(clean and rewrite all headers)")
 
 class IOMakeExcept(IOModeExcept):
     """raise if mismatching argument and options exception in make function"""
@@ -141,7 +176,8 @@ class IOMakeExcept(IOModeExcept):
         print("<make>    build pdf file with logs between the specified dates:")
         print(12*" " + "- update main LaTeX file with json data")
         print(12*" " + "- update main LaTeX file with logs to include")
-        print(12*" " + "- call pdflatex with main LaTeX file")
+        print(12*" " + "- call pdflatex until cross-references are settled")
+        print(12*" " + "- skip pdflatex if inputs did not change since last build")
         print(os.linesep, end="")
         print(10*" " + "usage:")
         print(12*" " + "> labbook -d <date> make              ", end="")
@@ -152,6 +188,26 @@ class IOMakeExcept(IOModeExcept):
         print("(from oldest date to <date>)")
         print(12*" " + "> labbook -s <date> -e <date> make    ", end="")
         print("(between dates, included)")
+        print(12*" " + "> labbook --force make                ", end="")
+        print("(build even if up to date)")
+        print(12*" " + "> labbook --split <period> make       ", end="")
+        print("(one pdf per month or year)")
+        print(12*" " + "> labbook --split <period> --combine make")
+        print(12*" " + "                                      ", end="")
+        print("(and a separate combined pdf)")
+        print(12*" " + "> labbook --split <period> --jobs <n> make")
+        print(12*" " + "                                      ", end="")
+        print("(with <n> parallel jobs)")
+        print(12*" " + "> labbook --changed make              ", end="")
+        print("(preview of entries changed since last make)")
+        print(12*" " + "> labbook --draft make                ", end="")
+        print("(draft pdf with figure boxes and without toc)")
+        print(12*" " + "> labbook --compiler <name> make      ", end="")
+        print("(pdflatex, xelatex, lualatex, latexmk or stub)")
+        print(12*" " + "> labbook --timeout <s> make          ", end="")
+        print("(stop a LaTeX pass after <s> seconds)")
+        print(10*" " + "compiler and timeout may also be set in param.lbk", end="")
+        print(" with LBKCOMPILER and LBKTIMEOUT")
 
 class IORemakeExcept(IOModeExcept):
     """raise if mismatching argument and options exception in remake function"""
@@ -167,10 +223,15 @@ class IORemakeExcept(IOModeExcept):
 
         print("<remake>  rebuild pdf file from LaTeX main file:")
         print(12*" " + "- get current main LaTeX file")
-        print(12*" " + "- call pdflatex with main LaTeX file")
+        print(12*" " + "- call pdflatex until cross-references are settled")
+        print(12*" " + "- write pdflatex output in .lbk/build folder")
         print(os.linesep, end="")
         print(10*" " + "usage:")
         print(12*" " + "> labbook remake")
+        print(12*" " + "> labbook --compiler <name> remake    ", end="")
+        print("(pdflatex, xelatex, lualatex, latexmk or stub)")
+        print(12*" " + "> labbook --timeout <s> remake        ", end="")
+        print("(stop a LaTeX pass after <s> seconds)")
 
 class IOTestExcept(IOModeExcept):
     """raise if mismatching argument and options exception in test function"""
@@ -191,6 +252,200 @@ class IOTestExcept(IOModeExcept):
         print(10*" " + "usage:")
         print(12*" " + "> labbook test")
 
+class IOBenchExcept(IOModeExcept):
+    """raise if mismatching argument and options exception in bench function"""
+    
+    def info(self):
+
+        print("Error: bench does not take any argument")
+        print(os.linesep, end="")
+        self.help()
+
+    @staticmethod
+    def help():
+
+        print("<bench>   time main LabBook features on a synthetic project:")
+        print(12*" " + "- generate daily entries in a temporary folder")
+        print(12*" " + "- time getLogDates, new, renew, rendering, make, clean")
+        print(12*" " + "- build with stub compiler, without TeX")
+        print(os.linesep, end="")
+        print(10*" " + "usage:")
+        print(12*" " + "> labbook bench                       ", end="")
+        print("(one year, no figure, 20 lines per log)")
+        print(12*" " + "> labbook --years <n> bench           ", end="")
+        print("(<n> years of daily entries)")
+        print(12*" " + "> labbook --figures <n> bench         ", end="")
+        print("(<n> figures per entry)")
+        print(12*" " + "> labbook --lines <n> bench           ", end="")
+        print("(<n> text lines per log)")
+        print(12*" " + "> labbook --output <file> bench       ", end="")
+        print("(save JSON results in <file>)")
+        print(12*" " + "> labbook --compare <file> bench      ", end="")
+        print("(compare with JSON results of <file>)")
+
+class IOHistoryExcept(IOModeExcept):
+    """raise if mismatching argument and options exception in history function"""
+    
+    def info(self):
+
+        print("Error: history does not take any argument")
+        print(os.linesep, end="")
+        self.help()
+
+    @staticmethod
+    def help():
+
+        print("<history> show history of make, remake and renew commands:")
+        print(12*" " + "- dates, entries, passes, wall time and pdf size")
+        print(12*" " + "- wall time and time per entry trends")
+        print(12*" " + "- regressions against previous builds, with slowest")
+        print(12*" " + "  phase, due to content or tooling")
+        print(12*" " + "- records are kept in .lbk/history.jsonl")
+        print(os.linesep, end="")
+        print(10*" " + "usage:")
+        print(12*" " + "> labbook history")
+
+class IOWatchExcept(IOModeExcept):
+    """raise if mismatching argument and options exception in watch function"""
+    
+    def info(self):
+
+        print("Error: watch takes either [], [-d], [-s], [-e] or [-s, -e] arguments")
+        print(os.linesep, end="")
+        self.help()
+
+    @staticmethod
+    def help():
+
+        print("<watch>   build pdf file again whenever project changes:")
+        print(12*" " + "- watch logs, tpl folders and param.lbk file")
+        print(12*" " + "- wait for a burst of saves to end before building")
+        print(12*" " + "- renew headers when header template changes")
+        print(12*" " + "- build only shards of changed logs with --split")
+        print(12*" " + "- stop with Ctrl-C")
+        print(os.linesep, end="")
+        print(10*" " + "usage:")
+        print(12*" " + "> labbook watch                       ", end="")
+        print("(all dates, takes make options)")
+        print(12*" " + "> labbook -s <date> -e <date> watch   ", end="")
+        print("(between dates, included)")
+        print(12*" " + "> labbook --poll watch                ", end="")
+        print("(scan files every second, no inotify)")
+
+class IODaemonExcept(IOModeExcept):
+    """raise if mismatching argument and options exception in daemon function"""
+    
+    def info(self):
+
+        print("Error: daemon does not take any argument")
+        print(os.linesep, end="")
+        self.help()
+
+    @staticmethod
+    def help():
+
+        print("<daemon>  serve new, make, renew, clean, search and check")
+        print(10*" " + "commands:")
+        print(12*" " + "- keep log index, templates and param.lbk in memory")
+        print(12*" " + "- listen on .lbk/daemon.sock")
+        print(12*" " + "- commands run in process when no daemon is running")
+        print(os.linesep, end="")
+        print(10*" " + "usage:")
+        print(12*" " + "> labbook daemon                      ", end="")
+        print("(start in background)")
+        print(12*" " + "> labbook --foreground daemon         ", end="")
+        print("(start in terminal, stop with Ctrl-C)")
+        print(12*" " + "> labbook --stop daemon               ", end="")
+        print("(stop daemon of project)")
+
+class IOBatchExcept(IOModeExcept):
+    """raise if mismatching argument and options exception in batch function"""
+    
+    def info(self):
+
+        print("Error: batch takes make, renew or clean and project folders")
+        print(os.linesep, end="")
+        self.help()
+
+    @staticmethod
+    def help():
+
+        print("<batch>   run make, renew or clean on many projects in parallel:")
+        print(12*" " + "- projects are folders or glob patterns of folders")
+        print(12*" " + "  holding a param.lbk file")
+        print(12*" " + "- worker processes are reused from project to project")
+        print(12*" " + "- each project builds one LaTeX file at a time")
+        print(12*" " + "- status and time of each project are reported at the end")
+        print(os.linesep, end="")
+        print(10*" " + "usage:")
+        print(12*" " + "> labbook batch make <dirs>           ", end="")
+        print("(build every project)")
+        print(12*" " + "> labbook --jobs <n> batch make <dirs>")
+        print(12*" " + "                                      ", end="")
+        print("(with <n> worker processes)")
+        print(12*" " + "> labbook -s <date> batch make <dirs> ", end="")
+        print("(with options of command)")
+        print(12*" " + "> labbook batch clean 'labs/*'        ", end="")
+        print("(quoted glob pattern)")
+
+class IOSearchExcept(IOModeExcept):
+    """raise if mismatching argument and options exception in search function"""
+    
+    def info(self):
+
+        print("Error: search takes words and either [], [-d], [-s], [-e] or")
+        print(7*" " + "[-s, -e] arguments")
+        print(os.linesep, end="")
+        self.help()
+
+    @staticmethod
+    def help():
+
+        print("<search>  find log entries holding every given word:")
+        print(12*" " + "- LaTeX commands and comments are not searched")
+        print(12*" " + "- quoted words are searched as a phrase")
+        print(12*" " + "- index in .lbk/search.json is updated from changed logs")
+        print(os.linesep, end="")
+        print(10*" " + "usage:")
+        print(12*" " + "> labbook search <words>              ", end="")
+        print("(all dates)")
+        print(12*" " + "> labbook search '<words>'            ", end="")
+        print("(words in this order)")
+        print(12*" " + "> labbook -s <date> -e <date> search <words>")
+        print(12*" " + "                                      ", end="")
+        print("(between dates, included)")
+
+class IOCheckExcept(IOModeExcept):
+    """raise if mismatching argument and options exception in check function"""
+    
+    def info(self):
+
+        print("Error: check takes either [], [-d], [-s], [-e] or [-s, -e]")
+        print(7*" " + "arguments")
+        print(os.linesep, end="")
+        self.help()
+
+    @staticmethod
+    def help():
+
+        print("<check>   find LaTeX problems of log entries without compiling:")
+        print(12*" " + "- undefined references of \\ref and \\lbkRef commands")
+        print(12*" " + "- labels defined more than once")
+        print(12*" " + "- missing or ambiguous figures of \\lbkFig and")
+        print(12*" " + "  \\includegraphics commands")
+        print(12*" " + "- only logs changed since cached in .lbk/check.json")
+        print(12*" " + "  are scanned again")
+        print(os.linesep, end="")
+        print(10*" " + "usage:")
+        print(12*" " + "> labbook check                       ", end="")
+        print("(all dates)")
+        print(12*" " + "> labbook -d <date> check             ", end="")
+        print("(one date)")
+        print(12*" " + "> labbook -s <date> -e <date> check   ", end="")
+        print("(between dates, included)")
+        print(12*" " + "> labbook --jobs <n> check            ", end="")
+        print("(scan logs with <n> threads)")
+
 # Mode exceptions ============================================================ #
 
 class ModeExcept(Exception):
@@ -203,6 +458,45 @@ class DoNothingExcept(ModeExcept):
 
         print("Do nothing and exit.")
 
+class RenewExcept(ModeExcept):
+    """raise when some headers could not be renewed"""
+
+    def info(self):
+
+        print("Error: " + str(len(self.args[0])) + " header(s) not renewed:")
+        for date, e in self.args[0]:
+            print(12*" " + "- " + date.strftime("%d/%m/%Y") + ": " + str(e))
+
+class BuildExcept(ModeExcept):
+    """raise when LaTeX compilation fails"""
+
+    def info(self):
+
+        print("Error: LaTeX compilation failed, see " + self.args[0] + ".")
+
+class BatchExcept(ModeExcept):
+    """raise when a command failed on some projects of a batch"""
+
+    def info(self):
+
+        print("Error: " + str(len(self.args[0])) + " project(s) failed:")
+        for root in self.args[0]:
+            print(12*" " + "- " + root)
+
+class StoreExcept(ModeExcept):
+    """raise when projects cannot be provisioned from a template store"""
+
+    def info(self):
+
+        print("Error: " + self.args[0] + ".")
+
+class CheckExcept(ModeExcept):
+    """raise when log entries hold undefined references or missing figures"""
+
+    def info(self):
+
+        print("Error: " + str(self.args[0]) + " error(s) found in log entries.")
+
 class InternalExcept(ModeExcept):
     """raise for unknown internal error"""
 
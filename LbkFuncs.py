@@ -2,35 +2,70 @@
 # -*- coding: utf-8 -*-
 
 import collections
+import contextlib
+import itertools
 import os
 import shutil
+import time
 import datetime
-import pprint
-import subprocess
-import distutils.dir_util
 
-import LbkTests
+import LbkTrace
 
 from LbkTools   import LbkTools
+from LbkTrace   import traced
 from LbkIO      import LbkIO
 from LbkIO      import Mode
+from LbkIO      import Flag
 
+from LbkExceptions import ModeExcept
+from LbkExceptions import IOFlagExcept
 from LbkExceptions import DoNothingExcept
+from LbkExceptions import RenewExcept
+from LbkExceptions import BuildExcept
+from LbkExceptions import BatchExcept
+from LbkExceptions import CheckExcept
+
+# results of main features
+LbkNew = collections.namedtuple('LbkNew', ['created', 'skipped'])
+LbkRenew = collections.namedtuple('LbkRenew', ['written', 'total'])
+LbkMake = collections.namedtuple('LbkMake', ['builds', 'upToDate', 'pdfs'])
+LbkClean = collections.namedtuple('LbkClean', ['files', 'size', 'dryRun'])
+LbkInit = collections.namedtuple('LbkInit', ['created', 'skipped', 'files'])
 
 class LbkFuncs:
     """main LabBook features"""
 
-    def __init__(self):
-        """LbkFuncs class constructor"""
+    def __init__(self, flags=None, lbkTools=None, root=None, echo=print,
+                 args=None):
+        """LbkFuncs class constructor, lbkTools being shared by a daemon or
+           a project, messages being printed by echo"""
+
+        # options without short form
+        self.flags = flags if flags else {}
+        # command line arguments following mode
+        self.args = args if args else []
+        # progress messages output, same signature as print
+        self.echo = echo
 
         # current module directory
         self.cmd=os.path.dirname(os.path.abspath(__file__))
-        # current working directory
-        self.cwd=os.getcwd()
+        # current working directory, project root
+        self.cwd=os.path.abspath(root) if root else os.getcwd()
         # curent template directory
         self.ctd=os.path.join(self.cwd,'tpl')
         # LbkTools instance
-        self.lbkTools=LbkTools(self.ctd, self.cwd)
+        self.lbkTools=lbkTools if lbkTools else LbkTools(self.ctd, self.cwd)
+        # LbkCompiler instance, set from parameters when building
+        self.lbkCompiler=None
+        # files written by builds
+        self.artifacts=set()
+        # pdf files output by builds
+        self.pdfs=set()
+        # LaTeX builds run and files found up to date
+        self.builds=[]
+        self.upToDate=[]
+        # dates, entries and passes of current command for history
+        self.summary={}
         # json parameter file
         self.paramPath=os.path.join(self.cwd, 'param.lbk')
 
@@ -44,156 +79,462 @@ class LbkFuncs:
             Mode.remake: self.remake,
             Mode.new   : self.new,
             Mode.renew : self.renew,
-            Mode.test  : LbkTests.tests
+            Mode.test  : self.test,
+            Mode.bench : self.bench,
+            Mode.history: self.history,
+            Mode.watch : self.watch,
+            Mode.daemon: self.daemon,
+            Mode.batch : self.batch,
+            Mode.search: self.search,
+            Mode.check : self.check
         }
         return funcs.get(mode)
 
+    def test(self, startDate, endDate):
+        """run embedded tests, loaded only for test mode"""
+
+        import LbkTests
+
+        LbkTests.tests(startDate, endDate)
+
+    def bench(self, startDate, endDate):
+        """time main features on a synthetic project"""
+
+        from LbkBench import LbkBench
+
+        # base results are checked before running
+        base = None
+        if Flag.compare in self.flags:
+            base = LbkBench.load(self.flags[Flag.compare])
+            if base is None:
+                self.echo("No benchmark results found in " +
+                          self.flags[Flag.compare] + ".")
+                raise DoNothingExcept()
+
+        lbkBench = LbkBench( self.flags.get(Flag.years, 1),
+                             self.flags.get(Flag.figures, 0),
+                             self.flags.get(Flag.lines, 20),
+                             echo=self.echo )
+        results = lbkBench.run()
+
+        if Flag.output in self.flags:
+            lbkBench.save(results, self.flags[Flag.output])
+            self.echo("> Results saved in " + self.flags[Flag.output] + ".")
+        if base:
+            lbkBench.compare(base, results)
+
+        return results
+
     def init(self, startDate, endDate):
-        """initialize LabBook project"""
-        
-        print("> Initialize and populate folder ... ", end="")
+        """initialize LabBook project, or many ones from a projects file"""
+
+        from LbkStore import LbkStore
+
+        # templates of LabBook or of a store, cloned when file system allows
+        lbkStore = LbkStore(self.flags.get(Flag.store,
+                                           os.path.join(self.cmd, 'tpl')))
+
+        if Flag.projects in self.flags:
+            return self.provision(lbkStore)
+
+        self.echo("> Initialize and populate folder ... ", end="")
+
+        try:
+            created = self.initProject(self.cwd, lbkStore)
+
+        except Exception:
+            self.echo("fail.")
+            raise
 
         # Check folder status
-        if os.path.isdir(os.path.join( self.ctd)) or \
-           os.path.isfile(self.paramPath):
-            
-            print("fail.")
-            print("Folder has already been initialized with LabBook project.")
+        if not created:
+            self.echo("fail.")
+            self.echo("Folder has already been initialized with LabBook "
+                      "project.")
             raise DoNothingExcept()
 
+        self.echo("ok.")
+        self.echo("> Edit and complete LabBook parameter file (param.lbk).")
+
+        return LbkInit([self.cwd], [], dict(lbkStore.counts))
+
+    def initProject(self, root, lbkStore, keyValues=None):
+        """create template folder and parameter file of project in root,
+           return False if already initialized"""
+
+        ctd = os.path.join(root, 'tpl')
+        paramPath = os.path.join(root, 'param.lbk')
+        if os.path.isdir(ctd) or os.path.isfile(paramPath):
+            return False
+
         # Create and populate template directory
-        try :
-            shutil.copytree(os.path.join(self.cmd,'tpl'), self.ctd)
+        lbkStore.populate(ctd)
 
-        except Exception:
-            print("fail.")
-            raise
-            
         # Create labbook parameter file
         keyvalues = {   'LBKAUTHOR': 'myName',
                         'LBKTITLE': 'myTitle',
                         'LBKFILENAME': 'myFileName'  }
-        try :
-            self.lbkTools.saveJsonFile( keyvalues, self.paramPath )
+        keyvalues.update(keyValues if keyValues else {})
+        self.lbkTools.saveJsonFile( keyvalues, paramPath )
+
+        return True
+
+    def provision(self, lbkStore):
+        """initialize projects listed with their parameters in projects
+           file, existing ones being skipped"""
+
+        projects = lbkStore.loadProjects(self.flags[Flag.projects])
+
+        self.echo("> Provision " + str(len(projects)) + " project(s) from " +
+                  lbkStore.path + " ... ", end="")
+
+        created, skipped = [], []
+        try:
+            for project in projects:
+                root = os.path.join(self.cwd, project.pop('folder'))
+                if self.initProject(root, lbkStore, project):
+                    created.append(root)
+                else:
+                    skipped.append(root)
 
         except Exception:
-            print("fail.")
-            raise            
+            self.echo("fail.")
+            raise
 
-        print("ok.")
-        print("> Edit and complete LabBook parameter file (param.lbk).")
+        counts = lbkStore.counts
+        self.echo("ok (" + str(len(created)) + " created, " +
+                  str(len(skipped)) + " skipped).")
+        self.echo("> Templates: " + str(counts['clone']) + " cloned, " +
+                  str(counts['copy']) + " copied.")
 
+        return LbkInit(created, skipped, dict(counts))
+
+    @traced()
     def clean(self, startDate, endDate):
         """clean LabBook project"""
 
-        print("> Clean folder ... ", end="")
+        self.echo("> Clean folder ... ", end="")
+
+        deep = self.flags.get(Flag.deep, False)
+        dryRun = self.flags.get(Flag.dry_run, False)
 
-        # extensions of file to delete
-        exts = ['.aux', '.toc', '.lof', '.log', '.out', '.gz']
-        
         try:
 
-            # remove non user file everywhere
-            for root, dirs, files in os.walk(self.cwd):
-                for file in files:
-                    if any(file.lower().endswith(ext) for ext in exts):
-                        os.remove(os.path.join(root, file))
+            # artifacts recorded by builds, whole project if not recorded
+            manifest = self.lbkTools.openCache('artifacts.json')
+            paths = manifest.get('files', [])
+            if deep or not manifest:
+                paths += self.lbkTools.scanArtifacts()
 
-            # remove pdf and tex files in current working directory
-            for file in os.listdir(self.cwd):
-                if file.endswith(".tex") or file.endswith(".pdf"):
-                    os.remove(os.path.join(self.cwd, file))
+            count, size = self.lbkTools.removeArtifacts(paths, dryRun)
 
         except Exception:
 
-            print("fail.")
+            self.echo("fail.")
             raise   
 
-        print("ok.")
+        if dryRun:
+            self.echo("dry run, " + str(count) + " file(s) and " + str(size) +
+                      " byte(s) would be reclaimed.")
+        else:
+            self.echo("ok (" + str(count) + " file(s), " + str(size) +
+                      " byte(s) reclaimed).")
+
+        return LbkClean(count, size, dryRun)
 
+    @traced()
     def new(self, startDate, endDate):
         """add one or more log entries to LabBook project"""
 
-        # Create log directory and store its LaTeX path
-        addDay = datetime.timedelta(days=1)
-        datePaths = {}
-        while startDate < endDate:
-            
-            # display message
-            strDate = LbkIO.date2str(startDate)
-            print("> Create new entry for " + strDate + " ... ", end="")
-
-            # fetch pathOS and pathLX for the given dates
-            pathOS, pathLX = self.lbkTools.getLogPath(startDate)
-                
-            # Check if entry exists or not
-            if not os.path.isdir(pathOS):
-
-                os.makedirs(pathOS)
-                datePaths[startDate] = (pathOS, pathLX)
-                print("ok.")
-
-            else:
+        # display message
+        if endDate - startDate == datetime.timedelta(days=1):
+            self.echo("> Create new entry for " + LbkIO.date2str(startDate),
+                      end="")
+        else:
+            self.echo("> Create new entries from " + LbkIO.date2str(startDate) +
+                      " to " +
+                      LbkIO.date2str(endDate - datetime.timedelta(days=1)),
+                      end="")
+        self.echo(" ... ", end="")
+
+        # days of the range matching recurrence rule
+        weekdays = self.flags.get(Flag.days, range(7))
+        dates = [ date for date in map( datetime.date.fromordinal,
+                                        range(startDate.toordinal(),
+                                              endDate.toordinal()) )
+                  if date.weekday() in weekdays ]
+
+        # existing entries listed once
+        existing = self.lbkTools.getLogDates(startDate, endDate)
+        missing = [ date for date in dates if date not in existing ]
+
+        # Create log directories and files in one pass
+        try:
+            self.lbkTools.createEntries(missing)
 
-                print("skip.")
+        except Exception:
+            self.echo("fail.")
+            raise
 
-            # increment
-            startDate += addDay
+        if len(dates) == 1:
+            self.echo("ok." if missing else "skip.")
+        else:
+            self.echo("ok (" + str(len(missing)) + " created, " +
+                      str(len(dates) - len(missing)) + " skipped).")
 
-        # copy files in each directory
-        sortDatePaths = collections.OrderedDict(sorted(datePaths.items()))
-        for date, paths in sortDatePaths.items():
+        return LbkNew(missing, [ date for date in dates if date in existing ])
 
-            # Paths
-            pathOS, pathLX = paths[0], paths[1]
+    def renew(self, startDate, endDate):
+        """renew header files whose content has changed for each log entry"""
 
-            # Create figs directory
-            os.mkdir(os.path.join(pathOS, 'figs'))
+        with self.recordHistory(Mode.renew):
+            return self.renewHeaders(startDate, endDate)
 
-            # Copy, replace and paste for header file
-            self.lbkTools.createHeader(date, pathOS, pathLX)
+    @traced()
+    def renewHeaders(self, startDate, endDate):
+        """renew header files whose content has changed for each log entry"""
 
-            # Copy, replace and paste for log file
-            self.lbkTools.createLog(date, pathOS, pathLX)
+        # clean all files and rewrite every header when forced
+        force = self.flags.get(Flag.force, False)
+        if force:
+            self.clean(startDate, endDate)
 
+        # get all logs and replace header files
+        self.echo("> Renew headers ... ", end="") 
 
-    def renew(self, startDate, endDate):
-        """delete and renew header files for each log entry"""
+        jobs = self.flags.get(Flag.jobs, os.cpu_count() or 1)
+        dates = self.lbkTools.getLogDates()
+        self.summarize(dates)
+        errors, written = self.lbkTools.createHeaders(dates, jobs, force)
 
-        # clean all files
-        self.clean(startDate, endDate)
+        if errors:
+            self.echo("fail.")
+            raise RenewExcept(errors)
 
-        # get all logs and replace header files
-        print("> Renew headers ... ", end="") 
+        self.echo("ok (" + str(written) + " of " + str(len(dates)) +
+                  " updated).")
 
-        try :
+        return LbkRenew(written, len(dates))
 
-            for date in self.lbkTools.getLogDates():
-                
-                pathOS, pathLX = self.lbkTools.getLogPath(date)
-                self.lbkTools.createHeader(date, pathOS, pathLX)
+    def make(self, startDate, endDate, shardKeys=None):
+        """build pdf file between given dates depending on available logs"""
 
-        except Exception:
-            
-            print("fail.")
-            raise
+        # files written by builds are recorded even if a build fails
+        with self.recordHistory(Mode.make):
+            try:
+                self.makeDates(startDate, endDate, shardKeys)
+            finally:
+                self.lbkTools.addArtifacts(self.artifacts)
 
-        print("ok.")
+        return self.built()
 
-    def make(self, startDate, endDate):
-        """build pdf file between given dates depending on available logs"""
-        print("> Build pdf output ... ") 
+    @traced()
+    def makeDates(self, startDate, endDate, shardKeys=None):
+        """build pdf file between given dates depending on available logs,
+           only shards of shardKeys are checked if given"""
+        self.echo("> Build pdf output ... ", end="") 
 
         # Logs to output
         dates = self.lbkTools.getLogDates(startDate, endDate)
 
         if len(dates) == 0:
-            print("No entry log found between ", end='')
-            print(LbkIO.date2str(startDate)+" and "+LbkIO.date2str(endDate)+".")
+            self.echo("skip.")
+            self.echo("No entry log found", end='')
+            if startDate:
+                self.echo(" from " + LbkIO.date2str(startDate), end='')
+            if endDate:
+                self.echo(" to " + LbkIO.date2str(endDate -
+                                                  datetime.timedelta(days=1)),
+                          end='')
+            self.echo(".")
             raise DoNothingExcept()
+        self.summarize(dates)
 
         # Copy, replace and paste LabBook file
         keyValues = self.lbkTools.openJsonFile(self.paramPath)
+        cache = self.lbkTools.openCache('build.json')
+        self.lbkCompiler = self.getCompiler(keyValues)
+
+        # One pdf file per month or year
+        split = self.flags.get(Flag.split)
+        if split:
+            self.makeShards(dates, keyValues, cache, split, shardKeys)
+            return
+
+        # Preview of entries changed since last full build
+        if self.flags.get(Flag.changed, False):
+            self.makeChanged(dates, keyValues, cache)
+            return
+
+        # create main latex file and save its name
+        filename = keyValues['LBKFILENAME'] + '.tex'
+        filedata = self.mainData(dates, keyValues)
+
+        # Draft with figure boxes and without lists in a separate pdf file
+        draft = self.flags.get(Flag.draft, False)
+        if draft:
+            filename = keyValues['LBKFILENAME'] + '-draft.tex'
+            filedata = self.draftData(filedata)
+
+        # Pdflatex compilation unless inputs did not change since last build
+        build, record = self.build(filename, filedata, dates, cache,
+                                   draft=draft)
+        if build is None:
+            self.echo("up to date.")
+            return
+
+        self.report(build.result())
+
+        # Save inputs of successful build
+        cache[filename] = record
+        self.lbkTools.saveCache('build.json', cache)
+
+    def draftData(self, filedata):
+        """turn main LaTeX file into a draft: figures are replaced by boxes
+           of same size, table of contents and list of figures of project
+           template are skipped"""
+
+        filedata = self.lbkTools.insertPreamble(filedata,
+                        '\\renewcommand{\\tableofcontents}{}' + os.linesep +
+                        '\\renewcommand{\\listoffigures}{}' )
+
+        return '\\PassOptionsToPackage{draft}{graphicx}' + os.linesep + filedata
+
+    @traced()
+    def makeShards(self, dates, keyValues, cache, split, shardKeys=None):
+        """build one pdf file per month or year with parallel jobs, shards
+           out of shardKeys already built are kept as they are"""
+
+        # group dates by shard
+        form = '%Y-%m' if split == 'month' else '%Y'
+        shards = [  (key, list(group)) for key, group in
+                    itertools.groupby(dates, lambda date: date.strftime(form)) ]
+        self.echo(str(len(shards)) + " shard(s).")
+
+        # each shard is built in its own output directory
+        results = []
+        for key, shardDates in shards:
+            outDir = os.path.join('.lbk', 'shards', key)
+            os.makedirs(os.path.join(self.cwd, outDir), exist_ok=True)
+            filename = os.path.join(outDir,
+                                    keyValues['LBKFILENAME'] + '-' + key + '.tex')
+            if shardKeys is not None and key not in shardKeys and \
+               filename in cache and \
+               os.path.isfile(os.path.join(self.cwd,
+                                           os.path.splitext(filename)[0] + '.pdf')):
+                self.upToDate.append(filename)
+                results.append(( filename, (None, cache[filename]) ))
+                continue
+            results.append(( filename, 
+                             self.build(filename,
+                                        self.mainData(shardDates, keyValues),
+                                        shardDates, cache, outDir) ))
+
+        # report shards in date order and copy their pdf file in main folder
+        failed, pdfnames = [], []
+        for filename, (build, record) in results:
+
+            pdfname = os.path.splitext(os.path.basename(filename))[0] + '.pdf'
+            self.echo("> Build " + pdfname + " ... ", end="")
+
+            if build is None:
+                self.echo("up to date.")
+            else:
+                build = build.result()
+                try:
+                    self.report(build)
+                except BuildExcept:
+                    failed.append(build.log)
+                    continue
+                cache[filename] = record
+
+            shutil.copyfile(os.path.join(self.cwd, os.path.dirname(filename),
+                                         pdfname),
+                            os.path.join(self.cwd, pdfname))
+            self.artifacts.add(pdfname)
+            pdfnames.append(pdfname)
+
+        self.lbkTools.saveCache('build.json', cache)
+
+        if failed:
+            raise BuildExcept(', '.join(failed))
+
+        # Combined pdf file including every shard, apart from full build
+        if self.flags.get(Flag.combine, False):
+
+            filename = keyValues['LBKFILENAME'] + '-combined.tex'
+            filedata = ''.join( ['\\documentclass{article}' + os.linesep,
+                                 '\\usepackage{pdfpages}' + os.linesep,
+                                 '\\begin{document}' + os.linesep] +
+                                ['\\includepdf[pages=-]{' + pdfname + '}' +
+                                 os.linesep for pdfname in pdfnames] +
+                                ['\\end{document}' + os.linesep] )
+            shardPrints = [ cache[filename]['fingerprint']
+                            for filename, result in results ]
+
+            self.echo("> Build " + keyValues['LBKFILENAME'] +
+                      "-combined.pdf ... ", end="")
+            build, record = self.build(filename, filedata, [], cache,
+                                       extra=shardPrints)
+            if build is None:
+                self.echo("up to date.")
+                return
+
+            self.report(build.result())
+            cache[filename] = record
+            self.lbkTools.saveCache('build.json', cache)
+
+    @traced()
+    def makeChanged(self, dates, keyValues, cache):
+        """build preview pdf file typesetting only entries changed since
+           last full build, other entries keep their auxiliary files"""
+
+        # last full build and its auxiliary file
+        name = keyValues['LBKFILENAME']
+        fullEntries = cache.get(name + '.tex', {}).get('entries')
+        if not fullEntries or \
+           not os.path.isfile(os.path.join(self.cwd, name + '.aux')):
+            self.echo("skip.")
+            self.echo("No full build found, run make first.")
+            raise DoNothingExcept()
+
+        # changed entries
+        includes = []
+        for date in dates:
+            pathOS = self.lbkTools.getLogPath(date)[0]
+            key = self.lbkTools.latexPath(pathOS.split(os.sep)[1:])
+            if fullEntries.get(key) != self.lbkTools.getEntrySignature(date):
+                includes.append(self.lbkTools.latexPath(['logs', key, 'log']))
+
+        if not includes:
+            self.echo("up to date.")
+            return
+        self.echo(str(len(includes)) + " changed log(s).")
+
+        # preview main file starts from auxiliary file of full build
+        filename = name + '-changed.tex'
+        filedata = self.lbkTools.insertPreamble(
+                        self.mainData(dates, keyValues),
+                        '\\includeonly{' + ','.join(includes) + '}' )
+        shutil.copyfile(os.path.join(self.cwd, name + '.aux'),
+                        os.path.join(self.cwd, name + '-changed.aux'))
+        self.artifacts.add(name + '-changed.aux')
+
+        self.echo("> Build " + name + "-changed.pdf ... ", end="")
+        build, record = self.build(filename, filedata, dates, cache)
+        if build is None:
+            self.echo("up to date.")
+            return
+
+        self.report(build.result())
+        cache[filename] = record
+        self.lbkTools.saveCache('build.json', cache)
+
+    @traced()
+    def mainData(self, dates, keyValues):
+        """render main LaTeX file including logs at given dates"""
+
+        keyValues = dict(keyValues)
 
         # 1. LabBook subtitle including date(s)
         if len(dates) == 1 :
@@ -209,26 +550,430 @@ class LbkFuncs:
                         'logs', d.strftime('%Y'), d.strftime('%m'),
                         d.strftime('%d'), 'log']) + '}' + os.linesep
                     for d in dates ])
-        
-        # 3. create main latex file and save its name
-        filename = keyValues['LBKFILENAME'] + '.tex'
-        self.lbkTools.replace( 'labbook.tex', filename, keyValues )
 
-        # Pdflatex compilation
-        subprocess.call(['pdflatex', filename])
-        subprocess.call(['pdflatex', filename])
+        return self.lbkTools.render('labbook.tex', keyValues)
+
+    @traced()
+    def build(self, filename, filedata, dates, cache, outDir='', extra=None,
+              draft=False):
+        """compile main LaTeX file unless its inputs did not change since last
+           build, return future LaTeX build (None if up to date) and inputs
+           record"""
+
+        fingerprint, entries = self.lbkTools.getFingerprint(dates, filedata,
+                                    [self.lbkCompiler.engine.name, extra])
+        record = { 'fingerprint': fingerprint, 'entries': entries }
+        pdfPath = os.path.join(self.cwd, outDir,
+                    os.path.splitext(os.path.basename(filename))[0] + '.pdf')
+
+        self.pdfs.add(pdfPath)
+        if not self.flags.get(Flag.force, False) and \
+           cache.get(filename, {}).get('fingerprint') == fingerprint and \
+           os.path.isfile(pdfPath):
+            self.upToDate.append(os.path.normpath(filename))
+            return None, record
+
+        self.lbkTools.writeFile(filename, filedata)
+        self.artifacts.add(os.path.normpath(filename))
+        return self.lbkCompiler.submit(filename, outDir, draft), record
+
+    @traced()
+    def getCompiler(self, keyValues):
+        """get LaTeX compiler from options or parameter file"""
+
+        # compiler and its subprocess machinery are only needed to build
+        from LbkCompiler import LbkCompiler
+        from LbkCompiler import engines
+
+        engine = self.flags.get(Flag.compiler,
+                                keyValues.get('LBKCOMPILER', 'pdflatex'))
+        timeout = self.flags.get(Flag.timeout, keyValues.get('LBKTIMEOUT'))
+
+        if engine not in engines:
+            self.echo("Unknown LaTeX compiler " + engine +
+                      " in parameter file.")
+            raise DoNothingExcept()
+
+        # parameter file value checked as the option is
+        try:
+            timeout = LbkIO.str2timeout(str(timeout)) if timeout else None
+        except IOFlagExcept as e:
+            self.echo("Error: " + e.args[0] + " in parameter file.")
+            raise DoNothingExcept()
+
+        # concurrent compilations limited for this call only
+        return LbkCompiler(self.cwd, engine, timeout,
+                           jobs=self.flags.get(Flag.jobs))
 
     def remake(self, startDate, endDate):
         """rebuild pdf file"""
 
-        # Main file
+        with self.recordHistory(Mode.remake):
+            self.remakeFile(startDate, endDate)
+
+        return self.built()
+
+    @traced()
+    def remakeFile(self, startDate, endDate):
+        """rebuild pdf file"""
+
+        # Main file, the one named in parameter file among several
         filenames = [   file for file in os.listdir(self.cwd)
                         if file.endswith(".tex") ]
+
+        if len(filenames) > 1 and os.path.isfile(self.paramPath):
+            filename = self.lbkTools.openJsonFile(self.paramPath).get(
+                            'LBKFILENAME', '') + '.tex'
+            filenames = [ file for file in filenames if file == filename ]
         
         if not len(filenames) == 1:
-            print("Impossible to identify main latex file.")
+            self.echo("Impossible to identify main latex file.")
             raise DoNothingExcept()
 
         # Pdflatex compilaton
-        subprocess.call(['pdflatex', filenames[0]])
+        keyValues = self.lbkTools.openJsonFile(self.paramPath) \
+                    if os.path.isfile(self.paramPath) else {}
+        self.lbkCompiler = self.getCompiler(keyValues)
+
+        self.echo("> Rebuild pdf output ... ", end="") 
+        self.pdfs.add(os.path.join(self.cwd,
+                                   os.path.splitext(filenames[0])[0] + '.pdf'))
+        try:
+            self.report(self.lbkCompiler.compile(filenames[0]))
+        finally:
+            self.lbkTools.addArtifacts(self.artifacts)
+
+    def report(self, build):
+        """print summary of LaTeX compilation, raise if it failed"""
+
+        self.artifacts.update(build.files)
+        self.builds.append(build)
+        self.summary['passes'] = self.summary.get('passes', 0) + build.passes
+
+        self.echo("ok." if build.status == 0 else "fail.")
+        self.echo("> " + str(build.passes) + " pass(es), " +
+                  str(len(build.errors)) + " error(s), " +
+                  str(len(build.warnings)) + " warning(s), see " + build.log)
+
+        # first messages only, full log is kept in build log
+        messages = build.errors + build.warnings
+        for message in messages[:10]:
+            self.echo(2*" " + "- " + message)
+        if len(messages) > 10:
+            self.echo(2*" " + "- ...")
+
+        if build.status != 0:
+            raise BuildExcept(build.log)
+
+    def built(self):
+        """result of last build command"""
+
+        return LbkMake(list(self.builds), list(self.upToDate),
+                       sorted( pdf for pdf in self.pdfs
+                               if os.path.isfile(pdf) ))
+
+    def summarize(self, dates):
+        """record dates and entries of current command for history"""
+
+        self.summary.update( entries=len(dates),
+                             start=dates[0].isoformat() if dates else None,
+                             end=dates[-1].isoformat() if dates else None )
+
+    @contextlib.contextmanager
+    def recordHistory(self, mode):
+        """append history record of enclosed command, timing its phases"""
+
+        from LbkHistory import LbkHistory
+
+        lbkHistory = LbkHistory(self.cwd)
+        self.pdfs, self.summary = set(), {}
+        self.builds, self.upToDate = [], []
+        start = time.perf_counter()
+        status = 'fail'
+
+        try:
+            with LbkTrace.recording() as events:
+                yield
+            status = 'ok'
+
+        except DoNothingExcept:
+            status = 'skip'
+            raise
+
+        finally:
+            self.summary['pdfSize'] = sum( os.path.getsize(pdf)
+                                           for pdf in self.pdfs
+                                           if os.path.isfile(pdf) )
+            lbkHistory.append(lbkHistory.record(
+                mode.name, [ LbkIO.flag2str(flag) for flag in self.flags ],
+                self.summary, events, time.perf_counter() - start, status ))
+
+    def history(self, startDate, endDate):
+        """show build history with trends and regressions"""
+
+        from LbkHistory import LbkHistory
+
+        lbkHistory = LbkHistory(self.cwd)
+        records = lbkHistory.load()
+
+        self.echo("> Read build history ... ", end="")
+        if not records:
+            self.echo("skip.")
+            self.echo("No build recorded yet, run make first.")
+            raise DoNothingExcept()
+        self.echo("ok (" + str(len(records)) + " record(s)).")
+
+        messages = lbkHistory.regressions(records)
+
+        # last records only, trends cover whole history
+        self.echo("  " + "time".ljust(19) + " " + "mode".ljust(6) +
+                  "entries".rjust(8) + "passes".rjust(7) +
+                  "wall (s)".rjust(10) + "pdf (kB)".rjust(10) + "  status")
+        for i, record in list(enumerate(records))[-20:]:
+            self.echo("  " +
+                      record.get('time', '').replace('T', ' ').ljust(19) +
+                      " " + str(record.get('mode')).ljust(6) +
+                      str(record.get('entries') or '-').rjust(8) +
+                      str(record.get('passes') or '-').rjust(7) +
+                      '{:.2f}'.format(record['wall']).rjust(10) +
+                      '{:.1f}'.format(
+                            (record.get('pdfSize') or 0) / 1024).rjust(10) +
+                      "  " + str(record.get('status')) +
+                      ("  <- " + messages[i] if i in messages else ""))
+
+        self.echo("> Trends:")
+        for line in lbkHistory.trends(records):
+            self.echo("  " + line)
+        if messages:
+            self.echo("> " + str(len(messages)) + " regression(s) found.")
+
+        return records
+
+    def watch(self, startDate, endDate):
+        """rebuild pdf file whenever logs, templates or parameter file change,
+           until interrupted"""
+
+        from LbkWatch import LbkWatch
+
+        lbkWatch = LbkWatch(self.cwd, self.flags.get(Flag.poll, False))
+        self.echo("> Watch logs, templates and parameter file with " +
+                  lbkWatch.method + ", press Ctrl-C to stop.")
+
+        try:
+            self.rebuild(startDate, endDate)
+            while True:
+                dates, templates, param = lbkWatch.classify(lbkWatch.wait())
+                self.rebuildChanges(startDate, endDate, dates, templates, param)
+
+        except KeyboardInterrupt:
+            self.echo()
+            self.echo("> Stop watching.")
+
+        finally:
+            lbkWatch.close()
+
+    def rebuildChanges(self, startDate, endDate, dates, templates, param):
+        """renew headers and rebuild pdf files affected by changes, dates
+           being None when any entry may have changed"""
+
+        # changed entries out of watched dates
+        if dates is not None:
+            dates = { date for date in dates
+                      if (startDate is None or date >= startDate) and
+                         (endDate is None or date < endDate) }
+
+        if dates is not None and not dates and not param and \
+           not templates & {'header.tex', 'labbook.tex'}:
+            return
+
+        # headers of watched entries only, unchanged ones are kept
+        if 'header.tex' in templates:
+            self.echo("> Renew headers ... ", end="")
+            logDates = self.lbkTools.getLogDates(startDate, endDate)
+            errors, written = self.lbkTools.createHeaders(logDates,
+                                self.flags.get(Flag.jobs, os.cpu_count() or 1))
+            if errors:
+                self.echo("fail.")
+                RenewExcept(errors).info()
+                return
+            self.echo("ok (" + str(written) + " of " + str(len(logDates)) +
+                      " updated).")
+
+        # shards of changed entries only when only logs changed
+        shardKeys = None
+        split = self.flags.get(Flag.split)
+        if split and dates and not param and not templates:
+            form = '%Y-%m' if split == 'month' else '%Y'
+            shardKeys = { date.strftime(form) for date in dates }
+
+        self.rebuild(startDate, endDate, shardKeys)
+
+    def rebuild(self, startDate, endDate, shardKeys=None):
+        """build pdf file and keep watching whatever happens"""
+
+        try:
+            self.make(startDate, endDate, shardKeys)
+
+        except ModeExcept as e:
+            e.info()
+
+        except Exception as e:
+            self.echo("unknown internal error")
+            self.echo(e)
+
+    def daemon(self, startDate, endDate):
+        """start or stop daemon serving commands of project"""
+
+        import LbkDaemon
+
+        if self.flags.get(Flag.stop, False):
+
+            self.echo("> Stop daemon ... ", end="")
+            if LbkDaemon.send({'stop': True}) is None:
+                self.echo("skip.")
+                self.echo("No daemon running in this folder.")
+                raise DoNothingExcept()
+            self.echo("ok.")
+            return
+
+        self.echo("> Start daemon on " + LbkDaemon.socketPath + " ... ", end="")
+        lbkDaemon = LbkDaemon.LbkDaemon(self.cwd)
+
+        try:
+            if not self.flags.get(Flag.foreground, False):
+                pid = lbkDaemon.detach()
+                self.echo("ok (pid " + str(pid) + ").")
+                return
+            lbkDaemon.bind()
+
+        except OSError as e:
+            self.echo("fail.")
+            self.echo("Daemon not started: " + str(e) + ".")
+            raise DoNothingExcept()
+
+        self.echo("ok, press Ctrl-C to stop.")
+        try:
+            lbkDaemon.serve()
+        except KeyboardInterrupt:
+            self.echo()
+            self.echo("> Stop daemon.")
+
+    def batch(self, startDate, endDate):
+        """run make, renew or clean command on many projects with a pool of
+           worker processes"""
+
+        from LbkBatch import LbkBatch
+
+        mode = Mode[self.args[0]]
+        lbkBatch = LbkBatch(self.flags.get(Flag.jobs))
+
+        roots, unmatched = lbkBatch.expand(self.args[1:])
+        for pattern in unmatched:
+            self.echo("No LabBook project found in " + pattern + ".")
+        if not roots:
+            raise DoNothingExcept()
+
+        # parallelism comes from projects, each one builds a file at a time
+        flags = { flag: arg for flag, arg in self.flags.items()
+                  if flag not in [Flag.jobs, Flag.trace, Flag.profile] }
+        if mode in [Mode.make, Mode.renew]:
+            flags[Flag.jobs] = 1
+
+        jobs = min(lbkBatch.jobs, len(roots))
+        self.echo("> Run " + mode.name + " on " + str(len(roots)) +
+                  " project(s) with " + str(jobs) + " job(s) ... ", end="")
+        start = time.perf_counter()
+        results = lbkBatch.run(roots, mode, startDate, endDate, flags)
+        wall = time.perf_counter() - start
+
+        failed = [ result for result in results if result.status == 'fail' ]
+        self.echo("fail." if failed else "ok.")
+
+        # status and time of each project in given order
+        for result in results:
+            self.echo("  " + result.status.ljust(6) +
+                      '{:.2f} s'.format(result.wall).rjust(10) + "  " +
+                      os.path.relpath(result.root))
+
+        # last messages of failed projects
+        for result in failed:
+            self.echo("> " + os.path.relpath(result.root) + ":")
+            for line in result.output.splitlines()[-10:]:
+                self.echo(2*" " + line)
+
+        counts = collections.Counter( result.status for result in results )
+        self.echo("> " + str(counts['ok']) + " ok, " + str(counts['skip']) +
+                  " skipped, " + str(counts['fail']) + " failed in " +
+                  '{:.2f} s'.format(wall) + " (" +
+                  '{:.2f} s'.format(sum( result.wall for result in results )) +
+                  " of project time).")
+
+        if failed:
+            raise BatchExcept([ result.root for result in failed ])
+
+        return results
+
+    def search(self, startDate, endDate):
+        """find log entries holding every given word or phrase"""
+
+        from LbkSearch import LbkSearch
+
+        self.echo("> Search log entries ... ", end="")
+
+        lbkSearch = LbkSearch(self.lbkTools)
+        lbkSearch.load()
+        dates = self.lbkTools.getLogDates(startDate, endDate)
+        changes = lbkSearch.update(dates, startDate, endDate)
+        results = lbkSearch.query(self.args, startDate, endDate)
+
+        self.echo("ok (" + str(len(results)) + " of " + str(len(dates)) +
+                  " entries, " + str(changes) + " reindexed).")
+        if not results:
+            self.echo("No entry holds " + " ".join(self.args) + ".")
+            raise DoNothingExcept()
+
+        # matching lines read for listed entries only
+        for date in results[:lbkSearch.shown]:
+            snippet = lbkSearch.snippet(date, self.args)
+            self.echo("  " + LbkIO.date2str(date) + "  " +
+                      (snippet[:64] + " ..." if len(snippet) > 68
+                       else snippet))
+        if len(results) > lbkSearch.shown:
+            self.echo("  ... " + str(len(results) - lbkSearch.shown) +
+                      " more entries, narrow dates with -s and -e.")
+
+        return results
+
+    def check(self, startDate, endDate):
+        """find undefined references, duplicate labels and missing or
+           ambiguous figures of log entries without compiling"""
+
+        from LbkCheck import LbkCheck
+
+        self.echo("> Check log entries ... ", end="")
+
+        lbkCheck = LbkCheck(self.lbkTools)
+        dates = self.lbkTools.getLogDates(startDate, endDate)
+        if not dates:
+            self.echo("skip.")
+            self.echo("No entry log found.")
+            raise DoNothingExcept()
+
+        problems = lbkCheck.check(dates, self.lbkTools.getLogDates(),
+                                  self.flags.get(Flag.jobs,
+                                                 os.cpu_count() or 1))
+        errors = sum( 1 for problem in problems if problem.level == 'error' )
+
+        self.echo(("fail" if errors else "ok") + " (" + str(len(dates)) +
+                  " entries, " + str(lbkCheck.scanned) + " scanned, " +
+                  str(errors) + " error(s), " +
+                  str(len(problems) - errors) + " warning(s)).")
+        for problem in problems:
+            self.echo("  " + LbkIO.date2str(problem.date) + "  l." +
+                      str(problem.line).ljust(5) + problem.level.ljust(9) +
+                      problem.message)
+
+        if errors:
+            raise CheckExcept(errors)
 
+        return problems
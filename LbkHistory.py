@@ -0,0 +1,181 @@
+#! /usr/local/bin/python3
+# -*- coding: utf-8 -*-
+
+import datetime
+import json
+import os
+import statistics
+
+class LbkHistory:
+    """project history of builds stored in .lbk/history.jsonl"""
+
+    # traced operations timed as build phases
+    phaseNames = {
+        'LbkTools.getLogDates'    : 'index',
+        'LbkTools.openJsonFile'   : 'json',
+        'LbkTools.openCache'      : 'json',
+        'LbkTools.saveCache'      : 'json',
+        'LbkFuncs.mainData'       : 'render',
+        'LbkTools.render'         : 'render',
+        'LbkTools.createHeaders'  : 'render',
+        'LbkTools.getFingerprint' : 'fingerprint',
+        'LbkCompiler.compile'     : 'compile',
+    }
+    # previous successful builds a build is compared with
+    window = 5
+    # slowdown ratio and minimal slowdown in seconds flagged as regression
+    ratio = 1.5
+    margin = 0.05
+
+    def __init__(self, cwd):
+        """LbkHistory class constructor"""
+
+        # history file, one JSON record per line
+        self.path = os.path.join(cwd, '.lbk', 'history.jsonl')
+
+    @classmethod
+    def phases(cls, events):
+        """wall time of each phase in seconds from traced events, overlapping
+           spans of parallel jobs are counted once"""
+
+        intervals = {}
+        for event in events:
+            phase = cls.phaseNames.get(event['name'])
+            if phase:
+                intervals.setdefault(phase, []).append(
+                    (event['ts'], event['ts'] + event['dur']) )
+
+        phases = {}
+        for phase, spans in intervals.items():
+
+            total, end = 0, None
+            for spanStart, spanEnd in sorted(spans):
+                if end is None or spanStart > end:
+                    total += spanEnd - spanStart
+                    end = spanEnd
+                elif spanEnd > end:
+                    total += spanEnd - end
+                    end = spanEnd
+
+            phases[phase] = round(total / 1e6, 4)
+
+        return phases
+
+    def record(self, mode, flags, summary, events, wall, status):
+        """build history record of a command"""
+
+        return { 'version': 1,
+                 'time': datetime.datetime.now().isoformat(timespec='seconds'),
+                 'mode': mode,
+                 'flags': sorted(flags),
+                 'start': summary.get('start'),
+                 'end': summary.get('end'),
+                 'entries': summary.get('entries'),
+                 'passes': summary.get('passes', 0),
+                 'pdfSize': summary.get('pdfSize'),
+                 'wall': round(wall, 4),
+                 'phases': self.phases(events),
+                 'status': status }
+
+    def append(self, record):
+        """append record to history file"""
+
+        os.makedirs(os.path.dirname(self.path), exist_ok=True)
+        with open(self.path, 'a') as historyFile:
+            historyFile.write(json.dumps(record) + os.linesep)
+
+    def load(self):
+        """load history records, skipping unreadable lines"""
+
+        records = []
+        try:
+            with open(self.path) as historyFile:
+                for line in historyFile:
+                    try:
+                        record = json.loads(line)
+                    except ValueError:
+                        continue
+                    if isinstance(record, dict) and 'wall' in record:
+                        records.append(record)
+
+        except OSError:
+            pass
+
+        return records
+
+    @staticmethod
+    def perEntry(record):
+        """wall time per entry or None"""
+
+        return record['wall'] / record['entries'] if record.get('entries') \
+               else None
+
+    def regressions(self, records):
+        """compare each successful build with median of previous ones of same
+           mode and flags, return messages by record position"""
+
+        messages = {}
+        previous = {}
+        for i, record in enumerate(records):
+
+            if record.get('status') != 'ok':
+                continue
+
+            key = (record.get('mode'), tuple(record.get('flags', [])))
+            base = previous.setdefault(key, [])
+
+            if base:
+                wall = statistics.median([ r['wall'] for r in base ])
+                if record['wall'] > self.ratio * wall and \
+                   record['wall'] - wall > self.margin:
+                    messages[i] = self.explain(record, base, wall)
+
+            base.append(record)
+            del base[:-self.window]
+
+        return messages
+
+    def explain(self, record, base, wall):
+        """describe regression: slowest phase and whether time per entry
+           grew, pointing to tooling, or not, pointing to content"""
+
+        message = 'regression x' + '{:.1f}'.format(record['wall'] / wall)
+
+        # phase with largest slowdown
+        slowdowns = {}
+        for phase, elapsed in record.get('phases', {}).items():
+            slowdowns[phase] = elapsed - statistics.median(
+                [ r.get('phases', {}).get(phase, 0) for r in base ])
+        if slowdowns:
+            message += ', ' + max(slowdowns, key=slowdowns.get)
+
+        perEntry = self.perEntry(record)
+        basePerEntry = [ self.perEntry(r) for r in base if self.perEntry(r) ]
+        if perEntry and basePerEntry:
+            grown = perEntry > self.ratio * statistics.median(basePerEntry)
+            message += ' (tooling)' if grown else ' (content)'
+
+        return message
+
+    def trends(self, records):
+        """summary of first and last successful builds of each mode"""
+
+        lines = []
+        for mode in sorted(set( record.get('mode') for record in records )):
+
+            done = [ record for record in records
+                     if record.get('mode') == mode and
+                        record.get('status') == 'ok' ]
+            if not done:
+                continue
+
+            first, last = done[0], done[-1]
+            line = mode + ": " + str(len(done)) + " build(s), wall " + \
+                   '{:.2f} s -> {:.2f} s'.format(first['wall'], last['wall'])
+            if self.perEntry(first) and self.perEntry(last):
+                line += ', per entry ' + '{:.1f} ms -> {:.1f} ms'.format(
+                            1000 * self.perEntry(first),
+                            1000 * self.perEntry(last))
+            lines.append(line)
+
+        return lines
@@ -3,15 +3,13 @@
 
 from enum import Enum, unique
 
-import io
-import json
 import os
-import shutil
+import re
 import datetime
-import pprint
 
 from LbkExceptions import IODateExcept
 from LbkExceptions import IODatesExcept
+from LbkExceptions import IOFlagExcept
 
 from LbkExceptions import IOInitExcept
 from LbkExceptions import IOCleanExcept
@@ -20,6 +18,13 @@ from LbkExceptions import IORenewExcept
 from LbkExceptions import IOMakeExcept
 from LbkExceptions import IORemakeExcept
 from LbkExceptions import IOTestExcept
+from LbkExceptions import IOBenchExcept
+from LbkExceptions import IOHistoryExcept
+from LbkExceptions import IOWatchExcept
+from LbkExceptions import IODaemonExcept
+from LbkExceptions import IOBatchExcept
+from LbkExceptions import IOSearchExcept
+from LbkExceptions import IOCheckExcept
 
 @unique
 class Mode(Enum):
@@ -32,6 +37,13 @@ class Mode(Enum):
     new    = 4
     renew  = 5
     test   = 6
+    bench  = 7
+    history= 8
+    watch  = 9
+    daemon = 10
+    batch  = 11
+    search = 12
+    check  = 13
 
 @unique
 class Opt(Enum):
@@ -41,6 +53,80 @@ class Opt(Enum):
     start  = 1
     end    = 2
 
+@unique
+class Flag(Enum):
+    """enumeration for input option without short form"""
+
+    jobs     = 0
+    force    = 1
+    split    = 2
+    combine  = 3
+    changed  = 4
+    compiler = 5
+    timeout  = 6
+    draft    = 7
+    deep     = 8
+    dry_run  = 9
+    days     = 10
+    years    = 11
+    figures  = 12
+    lines    = 13
+    output   = 14
+    compare  = 15
+    trace    = 16
+    profile  = 17
+    poll     = 18
+    stop     = 19
+    foreground = 20
+    store    = 21
+    projects = 22
+
+# Date parsing =============================================================== #
+
+# day keywords
+dayWords = { 'yesterday': -1, 'today': 0, 'tomorrow': 1 }
+
+# dates with separator, d/m, d/m/yy, d/m/yyyy
+sepDate = re.compile(r'^(?P<d>\d{1,2})(?P<s>[/.:,-])(?P<m>\d{1,2})'
+                     r'(?:(?P=s)(?P<y>\d{2}|\d{4}))?$')
+# dates without separator, ddmm, ddmmyy, ddmmyyyy
+numDate = re.compile(r'^(?P<d>\d{2})(?P<m>\d{2})(?P<y>\d{2}|\d{4})?$')
+# months, yyyy-mm
+monthRange = re.compile(r'^(\d{4})-(\d{1,2})$')
+
+def monthBounds(year, month):
+    """first day of month and first day of next month"""
+
+    startDate = datetime.date(year, month, 1)
+    endDate = datetime.date(year + month // 12, month % 12 + 1, 1)
+    return startDate, endDate
+
+def weekBounds(date, weeks=0):
+    """monday of date week shifted by weeks and next monday"""
+
+    startDate = date - datetime.timedelta(days=date.weekday(), weeks=-weeks)
+    return startDate, startDate + datetime.timedelta(weeks=1)
+
+def monthShift(date, months=0):
+    """month bounds of date shifted by months"""
+
+    month = date.year * 12 + date.month - 1 + months
+    return monthBounds(month // 12, month % 12 + 1)
+
+# period keywords
+periodWords = {
+    'last-week'  : lambda date: weekBounds(date, -1),
+    'this-week'  : lambda date: weekBounds(date),
+    'next-week'  : lambda date: weekBounds(date, 1),
+    'last-month' : lambda date: monthShift(date, -1),
+    'this-month' : lambda date: monthShift(date),
+    'next-month' : lambda date: monthShift(date, 1),
+    'last-year'  : lambda date: ( datetime.date(date.year - 1, 1, 1),
+                                  datetime.date(date.year, 1, 1) ),
+    'this-year'  : lambda date: ( datetime.date(date.year, 1, 1),
+                                  datetime.date(date.year + 1, 1, 1) ),
+}
+
 class LbkIO:
     """input/output data management"""
 
@@ -64,14 +150,114 @@ class LbkIO:
             Mode.new   : self.new,
             Mode.renew : self.renew,
             Mode.test  : self.test,
+            Mode.bench : self.bench,
+            Mode.history: self.history,
+            Mode.watch : self.watch,
+            Mode.daemon: self.daemon,
+            Mode.batch : self.batch,
+            Mode.search: self.search,
+            Mode.check : self.check,
         }
         return checker.get(mode);
 
+    def getFlagParser(self, flag):
+        """get argument parser linked to flag enumeration, None if no argument"""
+
+        parsers = {
+            Flag.jobs     : self.str2jobs,
+            Flag.split    : self.str2split,
+            Flag.compiler : self.str2compiler,
+            Flag.timeout  : self.str2timeout,
+            Flag.days     : self.str2days,
+            Flag.years    : self.str2years,
+            Flag.figures  : self.str2count,
+            Flag.lines    : self.str2count,
+            Flag.output   : self.str2path,
+            Flag.compare  : self.str2path,
+            Flag.trace    : self.str2path,
+            Flag.profile  : self.str2path,
+            Flag.store    : self.str2path,
+            Flag.projects : self.str2path,
+        }
+        return parsers.get(flag)
+
+    def getFlagOpts(self):
+        """get long option definitions of flags for getopt"""
+
+        return [    self.flag2str(flag) + 
+                    ('=' if self.getFlagParser(flag) else '')
+                    for flag in Flag ]
+
+    @staticmethod
+    def flag2str(flag):
+        """convert flag to long option name"""
+
+        return flag.name.replace('_', '-')
+
+    @staticmethod
+    def str2flag(strFlag):
+        """convert long option name to flag or None"""
+
+        return Flag.__members__.get(strFlag.replace('-', '_'))
+
+    def checkFlags(self, mode, flags):
+        """check that flags are accepted by mode"""
+
+        modeFlags = {
+            Mode.init  : [Flag.store, Flag.projects],
+            Mode.clean : [Flag.deep, Flag.dry_run],
+            Mode.new   : [Flag.days],
+            Mode.make  : [Flag.force, Flag.jobs, Flag.split, Flag.combine,
+                          Flag.changed, Flag.compiler, Flag.timeout,
+                          Flag.draft],
+            Mode.remake: [Flag.compiler, Flag.timeout],
+            Mode.renew : [Flag.jobs, Flag.force],
+            Mode.bench : [Flag.years, Flag.figures, Flag.lines, Flag.output,
+                          Flag.compare],
+            Mode.watch : [Flag.jobs, Flag.split, Flag.combine, Flag.changed,
+                          Flag.compiler, Flag.timeout, Flag.draft, Flag.poll],
+            Mode.daemon: [Flag.stop, Flag.foreground],
+            Mode.check : [Flag.jobs],
+            Mode.batch : [Flag.jobs, Flag.force, Flag.split, Flag.combine,
+                          Flag.changed, Flag.compiler, Flag.timeout,
+                          Flag.draft, Flag.deep, Flag.dry_run],
+        }
+
+        # flags accepted by every mode
+        globalFlags = [Flag.trace, Flag.profile]
+
+        # flags only meaningful with another flag
+        requiredFlags = {
+            Flag.combine : Flag.split,
+        }
+
+        # flags that cannot be used together
+        exclusiveFlags = {
+            Flag.changed : [Flag.split],
+            Flag.draft   : [Flag.split, Flag.changed],
+            Flag.stop    : [Flag.foreground],
+        }
+
+        for flag in flags:
+            if flag not in modeFlags.get(mode, []) + globalFlags:
+                raise IOFlagExcept( mode.name + " does not take --" +
+                                    self.flag2str(flag) + " option" )
+            if flag in requiredFlags and requiredFlags[flag] not in flags:
+                raise IOFlagExcept( "--" + self.flag2str(flag) + 
+                                    " option requires --" +
+                                    self.flag2str(requiredFlags[flag]) )
+            for other in exclusiveFlags.get(flag, []):
+                if other in flags:
+                    raise IOFlagExcept( "--" + self.flag2str(flag) + 
+                                        " option cannot be used with --" +
+                                        self.flag2str(other) )
+
     def usage(self):
         """define usage for LabBook app"""
 
         print("usage: labbook [-h | --help] [-d | --date <date>]")
-        print("               [-s | --start <date>] [-e | --end <date>] <command>")
+        print("               [-s | --start <date>] [-e | --end <date>]")
+        print("               [--trace <file>] [--profile <file>] <command>")
 
     def help(self):
         """define help for LabBook app"""
@@ -101,9 +287,37 @@ class LbkIO:
         print(2*os.linesep, end="")
         IOTestExcept.help()
 
+        print(2*os.linesep, end="")
+        IOBenchExcept.help()
+
+        print(2*os.linesep, end="")
+        IOHistoryExcept.help()
+
+        print(2*os.linesep, end="")
+        IOWatchExcept.help()
+
+        print(2*os.linesep, end="")
+        IODaemonExcept.help()
+
+        print(2*os.linesep, end="")
+        IOBatchExcept.help()
+
+        print(2*os.linesep, end="")
+        IOSearchExcept.help()
+
+        print(2*os.linesep, end="")
+        IOCheckExcept.help()
+
         print(2*os.linesep, end="")
         IODateExcept.help()
 
+        print(2*os.linesep, end="")
+        print("<file>    of global options:")
+        print(12*" " + "- --trace: timing spans of the command in Chrome trace")
+        print(12*" " + "  event format, to open in chrome://tracing or Perfetto")
+        print(12*" " + "- --profile: cProfile statistics of the command, to")
+        print(12*" " + "  read with pstats")
+
     def info_version(self):
 
         print("LabBook version " + ".".join([ str(i) for i in self.version ]))
@@ -114,62 +328,209 @@ class LbkIO:
 
         return date.strftime('%d/%m/%Y')
 
-    def str2date(self, strDate):
+    def str2date(self, strDate, today=None):
         """convert string to date and handle different format"""
 
         # initialization 
-        oneDay = datetime.timedelta(days=1)
-        todayDate = datetime.datetime.today().date()
-        yearDate = todayDate.year
-        separators = set(['/', '.', ':', '-'])
-        date = None
-
-        # conversion
-        if strDate.lower() == 'yesterday':
-            date = todayDate - oneDay
-
-        elif strDate.lower() == 'today':
-            date = todayDate
-        
-        elif strDate.lower() == 'tomorrow':
-            date = todayDate + oneDay
-        
-        # with separator
-        elif any( (sep in strDate) for sep in separators ):
+        todayDate = today if today else datetime.date.today()
+        strDate = strDate.strip().lower()
 
-            sep = [s for s in separators if s in strDate][0]
-            
-            d = strDate.split(sep)[0].zfill(2)
-            m = strDate.split(sep)[1].zfill(2)
-            y = strDate.split(sep)[2]   if strDate.count(sep) == 2\
-                                        else str(yearDate)[2:]
-            
-            f = '%d%m%y' if len(y) == 2 else '%d%m%Y'
-            
-            try :
-                date = datetime.datetime.strptime(d+m+y, f).date()
-            
-            except ValueError:
-                raise IODateExcept(strDate)
+        # keywords
+        if strDate in dayWords:
+            return todayDate + datetime.timedelta(days=dayWords[strDate])
+
+        # with separator, or without separator
+        match = sepDate.match(strDate) or numDate.match(strDate)
+        if not match:
+            raise IODateExcept(strDate)
 
-        # no separator
-        elif any( (len(strDate)==length) for length in [4,6,8] ):
+        d, m, y = match.group('d', 'm', 'y')
+        if y is None:
+            year = todayDate.year
+        elif len(y) == 2:
+            year = int(y) + (2000 if int(y) < 69 else 1900)
+        else:
+            year = int(y)
 
-            d = strDate[0:2]
-            m = strDate[2:4]
-            y = strDate[4:] if len(strDate) >= 6 else str(yearDate)[2:]
-            f = '%d%m%Y' if len(strDate) == 8 else '%d%m%y'
+        try :
+            return datetime.date(year, int(m), int(d))
 
-            try :
-                date = datetime.datetime.strptime(d+m+y, f).date()
+        except ValueError:
+            raise IODateExcept(strDate)
+
+    def str2range(self, strRange, today=None):
+        """convert string to dates range, end date being excluded, handle 
+           months (yyyy-mm), periods (last-week...) and ranges (d/m..d/m)"""
+
+        todayDate = today if today else datetime.date.today()
+        strRange = strRange.strip().lower()
+
+        # range between two expressions
+        if '..' in strRange:
+
+            first, last = strRange.split('..', 1)
+            startDate = self.str2range(first, todayDate)[0]
+            endDate = self.str2range(last, todayDate)[1]
+
+            if startDate >= endDate:
+                raise IODatesExcept(startDate, endDate)
+            return startDate, endDate
 
+        # month
+        match = monthRange.match(strRange)
+        if match:
+            try:
+                return monthBounds(int(match.group(1)), int(match.group(2)))
             except ValueError:
-                raise IODateExcept(strDate)
+                raise IODateExcept(strRange)
 
+        # periods around today
+        if strRange in periodWords:
+            return periodWords[strRange](todayDate)
+
+        # single day
+        date = self.str2date(strRange, todayDate)
+        return date, date + self.oneDay
+
+    def str2opt(self, opt, strArg):
+        """convert option argument, date gets a range, start and end get
+           first and last day of their range"""
+
+        startDate, endDate = self.str2range(strArg)
+
+        if opt is Opt.date:
+            return startDate, endDate
+        elif opt is Opt.start:
+            return startDate
         else:
-            raise IODateExcept(strDate)
-        
-        return date;
+            return endDate - self.oneDay
+
+    def expandRange(self, strRange, today=None):
+        """iterate lazily over dates of a range expression"""
+
+        startDate, endDate = self.str2range(strRange, today)
+        for ordinal in range(startDate.toordinal(), endDate.toordinal()):
+            yield datetime.date.fromordinal(ordinal)
+
+    def str2dates(self, strDates, today=None):
+        """convert many strings to dates, return dates (None on failure) and
+           (position, IODateExcept) errors"""
+
+        todayDate = today if today else datetime.date.today()
+        dates, errors = [], []
+
+        for i, strDate in enumerate(strDates):
+            try:
+                dates.append(self.str2date(strDate, todayDate))
+            except IODateExcept as e:
+                dates.append(None)
+                errors.append((i, e))
+
+        return dates, errors
+
+    def file2dates(self, path, today=None):
+        """convert dates of a file, one per line, see str2dates"""
+
+        with open(path) as file:
+            lines = [ line.strip() for line in file ]
+
+        return self.str2dates([ line for line in lines
+                                if line and not line.startswith('#') ], today)
+
+
+    @staticmethod
+    def str2jobs(strJobs):
+        """convert string to a positive number of parallel jobs"""
+
+        if not strJobs.isdigit() or int(strJobs) == 0:
+            raise IOFlagExcept( "number of jobs must be a positive integer, " +
+                                "got " + strJobs )
+
+        return int(strJobs)
+
+    @staticmethod
+    def str2split(strSplit):
+        """convert string to a shard period of make"""
+
+        if strSplit not in ['month', 'year']:
+            raise IOFlagExcept( "split period must be month or year, " +
+                                "got " + strSplit )
+
+        return strSplit
+
+    @staticmethod
+    def str2days(strDays):
+        """convert string to a set of weekdays, monday being 0"""
+
+        names = ['mon', 'tue', 'wed', 'thu', 'fri', 'sat', 'sun']
+        groups = {  'weekdays': names[0:5],
+                    'weekends': names[5:7] }
+
+        days = set()
+        for name in strDays.lower().split(','):
+            for day in groups.get(name, [name[0:3]]):
+                if day not in names:
+                    raise IOFlagExcept( "days must be weekdays, weekends or " +
+                                        "a list of " + ",".join(names) +
+                                        ", got " + strDays )
+                days.add(names.index(day))
+
+        return days
+
+    @staticmethod
+    def str2compiler(strCompiler):
+        """convert string to a LaTeX compiler name"""
+
+        compilers = ['pdflatex', 'xelatex', 'lualatex', 'latexmk', 'stub']
+        if strCompiler not in compilers:
+            raise IOFlagExcept( "compiler must be one of " +
+                                ", ".join(compilers) + ", got " + strCompiler )
+
+        return strCompiler
+
+    @staticmethod
+    def str2timeout(strTimeout):
+        """convert string to a positive timeout in seconds"""
+
+        try:
+            timeout = float(strTimeout)
+        except ValueError:
+            timeout = 0
+
+        if not timeout > 0:
+            raise IOFlagExcept( "timeout must be a positive number of " +
+                                "seconds, got " + strTimeout )
+
+        return timeout
+
+    @staticmethod
+    def str2years(strYears):
+        """convert string to a positive number of years"""
+
+        if not strYears.isdigit() or int(strYears) == 0:
+            raise IOFlagExcept( "number of years must be a positive integer, " +
+                                "got " + strYears )
+
+        return int(strYears)
+
+    @staticmethod
+    def str2count(strCount):
+        """convert string to a number of figures or lines"""
+
+        if not strCount.isdigit():
+            raise IOFlagExcept( "number of figures or lines must be a " +
+                                "non-negative integer, got " + strCount )
+
+        return int(strCount)
+
+    @staticmethod
+    def str2path(strPath):
+        """convert string to a file path"""
+
+        if not strPath:
+            raise IOFlagExcept("file path must not be empty")
+
+        return strPath
 
 
     def init(self, optargs):
@@ -195,8 +556,7 @@ class LbkIO:
             
             if Opt.date in optargs:
                 
-                startDate = optargs[Opt.date]
-                endDate   = optargs[Opt.date]+self.oneDay
+                startDate, endDate = optargs[Opt.date]
 
             elif Opt.start in optargs:
                 
@@ -225,7 +585,7 @@ class LbkIO:
     def renew(self, optargs):
         """option matching for renew mode"""
 
-        if len(optargs) is not 0:
+        if len(optargs) != 0:
             raise IORenewExcept()
 
         return None, None
@@ -242,8 +602,7 @@ class LbkIO:
             
             if Opt.date in optargs:
                 
-                startDate = optargs[Opt.date]
-                endDate   = optargs[Opt.date]+self.oneDay
+                startDate, endDate = optargs[Opt.date]
 
             elif Opt.start in optargs:
                 
@@ -267,7 +626,7 @@ class LbkIO:
             endDate   = optargs[Opt.end]+self.oneDay
 
             if startDate >= endDate:
-                raise DatesExcept(startDate, endDate)
+                raise IODatesExcept(startDate, endDate)
 
         else :
             raise IOMakeExcept()
@@ -289,3 +648,84 @@ class LbkIO:
             raise IOTestExcept()
 
         return None, None
+
+    def bench(self, optargs):
+        """option matching for bench mode"""
+
+        if len(optargs) != 0:
+            raise IOBenchExcept()
+
+        return None, None
+
+    def history(self, optargs):
+        """option matching for history mode"""
+
+        if len(optargs) != 0:
+            raise IOHistoryExcept()
+
+        return None, None
+
+    def watch(self, optargs):
+        """option matching for watch mode, same dates as make mode"""
+
+        try:
+            return self.make(optargs)
+
+        except IOMakeExcept:
+            raise IOWatchExcept()
+
+    def daemon(self, optargs):
+        """option matching for daemon mode"""
+
+        if len(optargs) != 0:
+            raise IODaemonExcept()
+
+        return None, None
+
+    def batch(self, optargs):
+        """option matching for batch mode, same dates as make mode"""
+
+        try:
+            return self.make(optargs)
+
+        except IOMakeExcept:
+            raise IOBatchExcept()
+
+    def checkBatch(self, args, optargs, flags):
+        """check command and project arguments of batch mode, then dates and
+           options against command, return command and project patterns"""
+
+        if len(args) < 2 or args[0] not in ['make', 'renew', 'clean']:
+            raise IOBatchExcept()
+
+        # jobs is the number of worker processes of batch mode
+        command = Mode[args[0]]
+        self.getChecker(command)(optargs)
+        self.checkFlags(command, [ flag for flag in flags
+                                   if flag is not Flag.jobs ])
+
+        return command, args[1:]
+
+    def search(self, optargs):
+        """option matching for search mode, same dates as make mode"""
+
+        try:
+            return self.make(optargs)
+
+        except IOMakeExcept:
+            raise IOSearchExcept()
+
+    def checkSearch(self, args):
+        """check that search mode is given words to look for"""
+
+        if not any( arg.strip() for arg in args ):
+            raise IOSearchExcept()
+
+    def check(self, optargs):
+        """option matching for check mode, same dates as make mode"""
+
+        try:
+            return self.make(optargs)
+
+        except IOMakeExcept:
+            raise IOCheckExcept()
@@ -0,0 +1,284 @@
+#! /usr/local/bin/python3
+# -*- coding: utf-8 -*-
+
+import array
+import bisect
+import collections.abc
+import contextlib
+import json
+import os
+import datetime
+
+from LbkTrace import traced
+
+class LbkDates(collections.abc.Sequence):
+    """read-only view of sorted log dates stored as day ordinals"""
+
+    def __init__(self, ordinals, lo=0, hi=None):
+        """LbkDates class constructor"""
+
+        # sorted ordinals shared between views, never modified in place
+        self.ordinals = ordinals
+        # view bounds
+        self.lo = lo
+        self.hi = len(ordinals) if hi is None else hi
+
+    def __len__(self):
+
+        return self.hi - self.lo
+
+    def __getitem__(self, idx):
+
+        if isinstance(idx, slice):
+            lo, hi, step = idx.indices(len(self))
+            if step != 1:
+                return [ self[i] for i in range(lo, hi, step) ]
+            return LbkDates(self.ordinals, self.lo + lo, self.lo + max(lo, hi))
+
+        if idx < 0:
+            idx += len(self)
+        if not 0 <= idx < len(self):
+            raise IndexError("LbkDates index out of range")
+        return datetime.date.fromordinal(self.ordinals[self.lo + idx])
+
+    def __iter__(self):
+
+        for i in range(self.lo, self.hi):
+            yield datetime.date.fromordinal(self.ordinals[i])
+
+    def __contains__(self, date):
+
+        return self.find(date) is not None
+
+    def __repr__(self):
+
+        return 'LbkDates(' + repr(list(self)) + ')'
+
+    def find(self, date):
+        """get position of date in view or None"""
+
+        ordinal = date.toordinal()
+        idx = bisect.bisect_left(self.ordinals, ordinal, self.lo, self.hi)
+        if idx < self.hi and self.ordinals[idx] == ordinal:
+            return idx - self.lo
+        return None
+
+    def select(self, startDate=None, endDate=None):
+        """view of dates from startDate included to endDate excluded"""
+
+        lo, hi = self.lo, self.hi
+        if startDate is not None:
+            lo = bisect.bisect_left(self.ordinals, startDate.toordinal(), lo, hi)
+        if endDate is not None:
+            hi = bisect.bisect_left(self.ordinals, endDate.toordinal(), lo, hi)
+        return LbkDates(self.ordinals, lo, hi)
+
+class LbkIndex:
+    """persistent index of log entries stored in project"""
+
+    def __init__(self, cwd):
+        """LbkIndex class constructor"""
+
+        # current working directory
+        self.cwd = cwd
+        # log directory
+        self.root = os.path.join(cwd, 'logs')
+        # index file
+        self.path = os.path.join(cwd, '.lbk', 'index.json')
+        # index data, loaded on first refresh
+        self.data = None
+        # index has to be saved
+        self.dirty = False
+        # sorted ordinals, rebuilt when index changes
+        self.store = None
+
+    @traced()
+    def load(self):
+        """load index file or start an empty index"""
+
+        self.data = {'mtime': None, 'years': {}}
+
+        try:
+            with open(self.path) as indexFile:
+                data = json.load(indexFile)
+
+            if data.get('version') == 1:
+                self.data = { 'mtime': data['mtime'], 'years': data['years'] }
+
+        except (OSError, ValueError, KeyError):
+            self.dirty = True
+
+    @traced()
+    def save(self):
+        """save index file if it has been modified"""
+
+        if self.dirty:
+            self.store = None
+
+        if not self.dirty or not os.path.isdir(self.root):
+            return
+
+        # LbkTools owns index
+        from LbkTools import LbkTools
+
+        LbkTools.dumpJson(self.path, {'version': 1,
+                                      'mtime': self.data['mtime'],
+                                      'years': self.data['years']})
+
+        self.dirty = False
+
+    @staticmethod
+    def listDirs(path, length):
+        """list sub-directories of path with numeric names and their mtime"""
+
+        dirs = {}
+        with os.scandir(path) as entries:
+            for entry in entries:
+                if len(entry.name) == length and entry.name.isdigit() and \
+                   entry.is_dir():
+                    dirs[entry.name] = entry.stat().st_mtime_ns
+        return dirs
+
+    @staticmethod
+    def mtime(path):
+        """get directory mtime or None when it does not exist"""
+
+        try:
+            return os.stat(path).st_mtime_ns
+        except OSError:
+            return None
+
+    @traced()
+    def refresh(self):
+        """rescan year and month directories whose mtime has changed"""
+
+        if self.data is None:
+            self.load()
+
+        # no log directory: empty index
+        rootTime = self.mtime(self.root)
+        if rootTime is None:
+            if self.data['years']:
+                self.data = {'mtime': None, 'years': {}}
+                self.dirty = True
+                self.store = None
+            return
+
+        # years
+        years = self.data['years']
+        if rootTime != self.data['mtime']:
+            found = self.listDirs(self.root, 4)
+            for year in set(years) - set(found):
+                del years[year]
+            for year in set(found) - set(years):
+                years[year] = {'mtime': None, 'months': {}}
+            self.data['mtime'] = rootTime
+            self.dirty = True
+
+        for year, yearData in years.items():
+
+            # months
+            yearPath = os.path.join(self.root, year)
+            yearTime = self.mtime(yearPath)
+            months = yearData['months']
+            if yearTime != yearData['mtime']:
+                found = self.listDirs(yearPath, 2) if yearTime else {}
+                for month in set(months) - set(found):
+                    del months[month]
+                for month in set(found) - set(months):
+                    months[month] = {'mtime': None, 'days': {}}
+                yearData['mtime'] = yearTime
+                self.dirty = True
+
+            for month, monthData in months.items():
+
+                # days
+                monthPath = os.path.join(yearPath, month)
+                monthTime = self.mtime(monthPath)
+                if monthTime != monthData['mtime']:
+                    found = self.listDirs(monthPath, 2) if monthTime else {}
+                    monthData['days'] = { day: dayTime
+                                          for day, dayTime in found.items()
+                                          if self.isDate(year, month, day) }
+                    monthData['mtime'] = monthTime
+                    self.dirty = True
+
+        self.save()
+
+    @staticmethod
+    def isDate(year, month, day):
+        """check that directory names build a valid date"""
+
+        try:
+            datetime.date(int(year), int(month), int(day))
+        except ValueError:
+            return False
+        return True
+
+    def folderData(self, year=None, month=None):
+        """index data of root, year or month directory, None if not indexed"""
+
+        data = self.data
+        if year is not None:
+            data = data['years'].get(year)
+        if data is not None and month is not None:
+            data = data['months'].get(month)
+        return data
+
+    @contextlib.contextmanager
+    def adding(self, dates):
+        """record log entries created within context without rescanning"""
+
+        if self.data is None:
+            self.refresh()
+
+        # directories whose stored mtime is current before creation, others
+        # having changed meanwhile are left to next refresh
+        folders = [()] + \
+                  sorted({ (str(date.year),) for date in dates }) + \
+                  sorted({ (str(date.year), str(date.month).zfill(2))
+                           for date in dates })
+        current = []
+        for folder in folders:
+            data = self.folderData(*folder)
+            if self.mtime(os.path.join(self.root, *folder)) == \
+               (data['mtime'] if data else None):
+                current.append(folder)
+
+        yield
+
+        for date in dates:
+
+            year, month, day = ( str(date.year),
+                                 str(date.month).zfill(2),
+                                 str(date.day).zfill(2) )
+            yearData = self.data['years'].setdefault(
+                            year, {'mtime': None, 'months': {}})
+            monthData = yearData['months'].setdefault(
+                            month, {'mtime': None, 'days': {}})
+            monthData['days'][day] = self.mtime(
+                            os.path.join(self.root, year, month, day))
+
+        # current directories are up to date with new entries
+        for folder in current:
+            self.folderData(*folder)['mtime'] = \
+                self.mtime(os.path.join(self.root, *folder))
+
+        self.dirty = True
+        self.save()
+
+    @traced()
+    def dates(self):
+        """view of indexed entry dates in chronological order"""
+
+        self.refresh()
+
+        if self.store is None:
+            ordinals = [ datetime.date(int(year), int(month), int(day)).toordinal()
+                         for year, yearData in self.data['years'].items()
+                         for month, monthData in yearData['months'].items()
+                         for day in monthData['days'] ]
+            ordinals.sort()
+            self.store = array.array('l', ordinals)
+
+        return LbkDates(self.store)
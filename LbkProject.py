@@ -0,0 +1,126 @@
+#! /usr/local/bin/python3
+# -*- coding: utf-8 -*-
+
+import datetime
+import os
+
+from LbkFuncs import LbkFuncs
+from LbkTools import LbkTools
+from LbkIO    import LbkIO
+from LbkIO    import Mode
+from LbkIO    import Opt
+from LbkIO    import Flag
+
+from LbkExceptions import IOFlagExcept
+
+class LbkProject:
+    """LabBook project driven in process: features return results and raise
+       LbkExceptions instead of printing and exiting"""
+
+    def __init__(self, root, echo=None):
+        """LbkProject class constructor, progress messages are dropped unless
+           echo, with the signature of print, is given"""
+
+        # project root, independent of current working directory
+        self.root = os.path.abspath(root)
+        # progress messages output
+        self.echo = echo if echo else lambda *args, **kwargs: None
+        # LbkIO instance checking options
+        self.lbkIO = LbkIO()
+        # LbkTools instance shared by calls, keeping its caches warm
+        self.lbkTools = LbkTools(os.path.join(self.root, 'tpl'), self.root)
+
+    def funcs(self, mode, start=None, end=None, date=None, args=None,
+              **options):
+        """check dates and options of mode as command line does, return
+           LbkFuncs instance with start and end dates"""
+
+        # dates as strings of command line or date objects
+        optargs = {}
+        for opt, value in ((Opt.start, start), (Opt.end, end),
+                           (Opt.date, date)):
+            if value is None:
+                continue
+            if isinstance(value, str):
+                optargs[opt] = self.lbkIO.str2opt(opt, value)
+            elif opt is Opt.date:
+                optargs[opt] = (value, value + datetime.timedelta(days=1))
+            else:
+                optargs[opt] = value
+
+        startDate, endDate = self.lbkIO.getChecker(mode)(optargs)
+
+        # options named after flags, strings being parsed as on command line
+        flags = {}
+        for name, value in options.items():
+            flag = Flag.__members__.get(name)
+            if flag is None:
+                raise IOFlagExcept( mode.name + " does not take " + name +
+                                    " option" )
+            if value is None or value is False:
+                continue
+            parser = self.lbkIO.getFlagParser(flag)
+            flags[flag] = parser(value) if parser and isinstance(value, str) \
+                          else value
+
+        self.lbkIO.checkFlags(mode, flags)
+
+        return LbkFuncs(flags, self.lbkTools, self.root, self.echo, args), \
+               startDate, endDate
+
+    def run(self, mode, *args, **kwargs):
+        """run feature of mode, return its result"""
+
+        lbkFuncs, startDate, endDate = self.funcs(mode, *args, **kwargs)
+        return lbkFuncs.getFunc(mode)(startDate, endDate)
+
+    def init(self, **options):
+        """initialize project folder, or projects of a projects file, return
+           LbkInit with created and skipped folders and shared files"""
+
+        os.makedirs(self.root, exist_ok=True)
+        return self.run(Mode.init, **options)
+
+    def new(self, start=None, end=None, date=None, days=None):
+        """add log entries, return LbkNew with created and skipped dates"""
+
+        return self.run(Mode.new, start, end, date, days=days)
+
+    def renew(self, **options):
+        """renew changed headers, return LbkRenew"""
+
+        return self.run(Mode.renew, **options)
+
+    def make(self, start=None, end=None, date=None, **options):
+        """build pdf files, return LbkMake with LaTeX builds, up to date
+           files and pdf files"""
+
+        return self.run(Mode.make, start, end, date, **options)
+
+    def remake(self, **options):
+        """rebuild main pdf file, return LbkMake"""
+
+        return self.run(Mode.remake, **options)
+
+    def clean(self, **options):
+        """remove build artifacts, return LbkClean"""
+
+        return self.run(Mode.clean, **options)
+
+    def search(self, terms, start=None, end=None, date=None):
+        """find log entries holding every term, a term of several words
+           being a phrase, return their dates"""
+
+        self.lbkIO.checkSearch(terms)
+        return self.run(Mode.search, start, end, date, args=list(terms))
+
+    def check(self, start=None, end=None, date=None, **options):
+        """find LaTeX problems of log entries without compiling, return
+           warnings, errors raising CheckExcept"""
+
+        return self.run(Mode.check, start, end, date, **options)
+
+    def history(self):
+        """get recorded build history"""
+
+        return self.run(Mode.history)
@@ -0,0 +1,227 @@
+#! /usr/local/bin/python3
+# -*- coding: utf-8 -*-
+
+import datetime
+import os
+import re
+
+from LbkTrace import traced
+
+# indexes loaded by a long running process, with mtime and size of their file
+indexCache = {}
+
+class LbkSearch:
+    """inverted index of log entry words stored in .lbk/search.json"""
+
+    # index format, older ones are rebuilt
+    version = 1
+    # LaTeX markup dropped before indexing, arguments of commands are kept
+    # but those naming files, labels and environments
+    comment = re.compile(r'(?<!\\)%.*$', re.MULTILINE)
+    reference = re.compile(r'\\(?:input|include|includegraphics|label|ref|'
+                           r'eqref|pageref|cite|lbkRef|lbkFig|begin|end)\*?'
+                           r'\s*(?:\[[^\]]*\])?\s*\{[^}]*\}')
+    command = re.compile(r'\\(?:[a-zA-Z@]+\*?|.)|[{}$^&~]')
+    # words, lowercase
+    word = re.compile(r'[^\W_]+')
+    # entries listed with their matching line
+    shown = 20
+
+    def __init__(self, lbkTools):
+        """LbkSearch class constructor"""
+
+        # LbkTools instance of project
+        self.lbkTools = lbkTools
+        # logs folder and index file
+        self.logs = os.path.join(lbkTools.cwd, 'logs')
+        self.path = os.path.join(lbkTools.cwd, '.lbk', 'search.json')
+        # mtime and size of log file when indexed, by entry key
+        self.entries = {}
+        # space separated keys of entries holding each word, decoded only
+        # for words looked for
+        self.postings = {}
+
+    @classmethod
+    def strip(cls, text):
+        """remove LaTeX comments, references and commands"""
+
+        text = cls.comment.sub('', text)
+        text = cls.reference.sub(' ', text)
+        return cls.command.sub(' ', text)
+
+    @classmethod
+    def words(cls, text):
+        """list words of plain text in order"""
+
+        return cls.word.findall(text.lower())
+
+    def logPath(self, date):
+        """path of log file of an entry, see LbkTools.getLogPath"""
+
+        return os.sep.join(( self.logs, str(date.year), '%02d' % date.month,
+                             '%02d' % date.day, 'log.tex' ))
+
+    def read(self, date):
+        """plain text of log file of an entry, empty if unreadable"""
+
+        try:
+            with open(self.logPath(date), errors='replace') as file:
+                return self.strip(file.read())
+        except OSError:
+            return ''
+
+    @staticmethod
+    def bounds(startDate, endDate):
+        """range of entry keys, being day ordinals, between dates"""
+
+        return ( startDate.toordinal() if startDate else 0,
+                 endDate.toordinal() if endDate else
+                 datetime.date.max.toordinal() + 1 )
+
+    @traced()
+    def load(self):
+        """load index from project cache, unless already in memory"""
+
+        try:
+            stat = os.stat(self.path)
+        except OSError:
+            return
+
+        cached = indexCache.get(self.path)
+        if cached and cached[0:2] == (stat.st_mtime_ns, stat.st_size):
+            self.entries, self.postings = cached[2:]
+            return
+
+        index = self.lbkTools.openCache('search.json')
+        if index.get('version') == self.version:
+            self.entries = index.get('entries', {})
+            self.postings = index.get('postings', {})
+            self.remember()
+
+    def remember(self):
+        """keep index in memory along with stat of its file"""
+
+        stat = os.stat(self.path)
+        indexCache[self.path] = ( stat.st_mtime_ns, stat.st_size,
+                                  self.entries, self.postings )
+
+    @traced()
+    def update(self, dates, startDate=None, endDate=None):
+        """index entries of dates whose log file changed since indexed and
+           forget removed entries between dates, return number of changes"""
+
+        stats = {}
+        for date in dates:
+            try:
+                stat = os.stat(self.logPath(date))
+                stats[str(date.toordinal())] = (date, [stat.st_mtime_ns,
+                                                       stat.st_size])
+            except OSError:
+                pass
+
+        # entries changed or removed between dates
+        first, last = self.bounds(startDate, endDate)
+        changed = { key for key, (date, stat) in stats.items()
+                    if self.entries.get(key) != stat }
+        removed = { key for key in self.entries
+                    if first <= int(key) < last and key not in stats }
+        if not changed and not removed:
+            return 0
+
+        # stale keys are dropped, substring test sparing decoding of words
+        # of other entries when few entries changed
+        stale = changed | removed
+        for word, keys in list(self.postings.items()):
+            if len(stale) <= 16 and not any( key in keys for key in stale ):
+                continue
+            kept = [ key for key in keys.split() if key not in stale ]
+            if kept:
+                self.postings[word] = ' '.join(kept)
+            else:
+                del self.postings[word]
+        for key in removed:
+            del self.entries[key]
+
+        # words of changed entries
+        added = {}
+        for key in changed:
+            date, stat = stats[key]
+            for word in set(self.words(self.read(date))):
+                added.setdefault(word, []).append(key)
+            self.entries[key] = stat
+        for word, keys in added.items():
+            self.postings[word] = ' '.join( ([self.postings[word]]
+                                             if word in self.postings else [])
+                                            + keys )
+
+        self.lbkTools.saveCache('search.json', { 'version': self.version,
+                                                 'entries': self.entries,
+                                                 'postings': self.postings })
+        self.remember()
+        return len(stale)
+
+    @classmethod
+    def phrases(cls, terms):
+        """words of each term holding some"""
+
+        phrases = [ cls.words(cls.strip(term)) for term in terms ]
+        return [ phrase for phrase in phrases if phrase ]
+
+    @traced()
+    def query(self, terms, startDate=None, endDate=None):
+        """dates of entries between dates holding every term, a term of
+           several words being a phrase"""
+
+        phrases = self.phrases(terms)
+        if not phrases:
+            return []
+
+        # entries holding every word, rarest word first
+        words = sorted({ word for phrase in phrases for word in phrase },
+                       key=lambda word: len(self.postings.get(word, '')))
+        first, last = self.bounds(startDate, endDate)
+        keys = { int(key) for key in self.postings.get(words[0], '').split() }
+        keys = { key for key in keys if first <= key < last }
+        for word in words[1:]:
+            if not keys:
+                break
+            keys.intersection_update( int(key) for key in
+                                      self.postings.get(word, '').split() )
+
+        dates = [ datetime.date.fromordinal(key) for key in sorted(keys) ]
+
+        # phrases only checked on text of candidate entries
+        phrases = [ phrase for phrase in phrases if len(phrase) > 1 ]
+        if not phrases:
+            return dates
+
+        results = []
+        for date in dates:
+            text = self.words(self.read(date))
+            if all( self.contains(text, phrase) for phrase in phrases ):
+                results.append(date)
+        return results
+
+    def snippet(self, date, terms):
+        """first line of an entry holding first word of terms"""
+
+        phrases = self.phrases(terms)
+        if not phrases:
+            return ''
+
+        for line in self.read(date).splitlines():
+            if phrases[0][0] in self.words(line):
+                return ' '.join(line.split())
+        return ''
+
+    @staticmethod
+    def contains(text, phrase):
+        """whether words of phrase follow each other in text"""
+
+        if len(phrase) == 1:
+            return phrase[0] in text
+
+        size = len(phrase)
+        return any( text[i:i+size] == phrase
+                    for i in range(len(text) - size + 1)
+                    if text[i] == phrase[0] )
@@ -0,0 +1,108 @@
+#! /usr/local/bin/python3
+# -*- coding: utf-8 -*-
+
+import csv
+import errno
+import json
+import os
+import shutil
+
+try:
+    import fcntl
+except ImportError:
+    fcntl = None
+
+from LbkExceptions import StoreExcept
+
+# Linux ioctl sharing file extents between two files
+FICLONE = 0x40049409
+
+class LbkStore:
+    """template store populating project template folders with clones of its
+       files, copy-on-write being done by file system, or with copies"""
+
+    # templates required by LabBook
+    templates = ['header.tex', 'labbook.tex', 'log.tex']
+    # errors meaning that a file system cannot clone files
+    unsupported = { errno.EOPNOTSUPP, errno.ENOTTY, errno.EXDEV, errno.EINVAL,
+                    errno.EPERM, errno.ENOSYS }
+
+    def __init__(self, path):
+        """LbkStore class constructor"""
+
+        # store folder
+        self.path = os.path.abspath(path)
+        # file system support, tried on first file
+        self.reflinks = fcntl is not None
+        # files cloned and copied
+        self.counts = { 'clone': 0, 'copy': 0 }
+
+        missing = [ name for name in self.templates
+                    if not os.path.isfile(os.path.join(self.path, name)) ]
+        if missing:
+            raise StoreExcept("template store " + self.path + " lacks " +
+                              ", ".join(missing))
+
+    def clone(self, src, dst):
+        """share extents of src with new dst file, copy-on-write being done
+           by file system, raise OSError if unsupported"""
+
+        with open(src, 'rb') as srcFile, open(dst, 'xb') as dstFile:
+            try:
+                fcntl.ioctl(dstFile.fileno(), FICLONE, srcFile.fileno())
+            except OSError:
+                os.remove(dst)
+                raise
+
+    def share(self, src, dst):
+        """create dst from src by cloning or copying it, return method
+           used"""
+
+        if self.reflinks:
+            try:
+                self.clone(src, dst)
+                return 'clone'
+            except OSError as e:
+                if e.errno not in self.unsupported:
+                    raise
+                self.reflinks = False
+
+        shutil.copyfile(src, dst)
+        return 'copy'
+
+    def populate(self, ctd):
+        """create template folder ctd with store files"""
+
+        for root, dirs, files in os.walk(self.path):
+            target = os.path.join(ctd, os.path.relpath(root, self.path))
+            os.makedirs(target, exist_ok=True)
+            for name in files:
+                method = self.share(os.path.join(root, name),
+                                    os.path.join(target, name))
+                self.counts[method] += 1
+
+    @staticmethod
+    def loadProjects(path):
+        """load project folders and their parameters from a CSV file with a
+           header row or a JSON list, each project having a folder key"""
+
+        try:
+            with open(path, newline='') as file:
+                if path.lower().endswith('.json'):
+                    projects = json.load(file)
+                else:
+                    projects = list(csv.DictReader(file))
+
+        except (OSError, ValueError, csv.Error) as e:
+            raise StoreExcept("cannot read projects file " + path + ": " +
+                              str(e))
+
+        if not isinstance(projects, list) or \
+           not all( isinstance(project, dict) and project.get('folder')
+                    for project in projects ):
+            raise StoreExcept("every project of " + path + " needs a folder")
+
+        # empty cells keep default parameters
+        return [ { key: str(value) for key, value in project.items()
+                   if key and value not in (None, '') }
+                 for project in projects ]
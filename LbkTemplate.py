@@ -0,0 +1,55 @@
+#! /usr/local/bin/python3
+# -*- coding: utf-8 -*-
+
+import os
+import re
+import threading
+
+from LbkTrace import traced
+
+# compiled templates: (path, keys) -> (mtime, size, template)
+cache = {}
+cacheLock = threading.Lock()
+
+class LbkTemplate:
+    """template compiled into literal chunks and placeholder slots"""
+
+    def __init__(self, text, keys):
+        """LbkTemplate class constructor"""
+
+        # longest keys first so that a key never hides a longer one
+        keys = sorted([ key for key in keys if key ], key=len, reverse=True)
+
+        # even chunks are literals, odd chunks are placeholder keys
+        if keys:
+            pattern = re.compile('(' + '|'.join(map(re.escape, keys)) + ')')
+            self.chunks = pattern.split(text)
+        else:
+            self.chunks = [text]
+
+    def render(self, keyvalues):
+        """replace placeholders by their values in a single pass"""
+
+        chunks = list(self.chunks)
+        chunks[1::2] = [ keyvalues[key] for key in self.chunks[1::2] ]
+        return ''.join(chunks)
+
+    @staticmethod
+    @traced()
+    def load(path, keys):
+        """get compiled template, compiling it again if file has changed"""
+
+        stat = os.stat(path)
+        cacheKey = (os.path.abspath(path), frozenset(keys))
+
+        with cacheLock:
+            cached = cache.get(cacheKey)
+        if cached and cached[0:2] == (stat.st_mtime_ns, stat.st_size):
+            return cached[2]
+
+        with open(path, 'r') as file:
+            template = LbkTemplate(file.read(), keys)
+
+        with cacheLock:
+            cache[cacheKey] = (stat.st_mtime_ns, stat.st_size, template)
+        return template
@@ -1,8 +1,14 @@
 #! /usr/local/bin/python3
 # -*- coding: utf-8 -*-
 
+import contextlib
+import io
+import json
 import os
+import shutil
 import sys
+import tempfile
+import exitstatus
 
 import LabBook
 
@@ -12,8 +18,28 @@ from datetime import timedelta
 
 from LbkIO import LbkIO
 from LbkIO import Opt
+from LbkIO import Flag
+from LbkIndex import LbkIndex
+from LbkTools import LbkTools
+from LbkTemplate import LbkTemplate
+from LbkCompiler import LbkCompiler
+from LbkFuncs import LbkFuncs
+from LbkBench import LbkBench
+from LbkHistory import LbkHistory
+from LbkWatch import LbkWatch
+
+import LbkDaemon
+
+from LbkProject import LbkProject
+from LbkBatch import LbkBatch
+from LbkCheck import LbkCheck
 
 from LbkExceptions import IODateExcept
+from LbkExceptions import IODatesExcept
+from LbkExceptions import IOFlagExcept
+from LbkExceptions import IONewExcept
+from LbkExceptions import DoNothingExcept
+from LbkExceptions import CheckExcept
 
 # test str2date [LbkIO] ====================================================== #
 
@@ -103,16 +129,918 @@ def test_LbkIO_str2date():
 
     print("ok")
 
+# test str2range [LbkIO] ===================================================== #
+
+def test_LbkIO_str2range():
+    """test range expressions and batch parsing"""
+
+    # initialization, sunday 18/10/2026
+    lbkIO = LbkIO()
+    today = date(2026, 10, 18)
+
+    # tests
+    tests = [
+        {"str": "2/3/70",       "ref": (date(1970, 3, 2), date(1970, 3, 3))},
+        {"str": "2016-03",      "ref": (date(2016, 3, 1), date(2016, 4, 1))},
+        {"str": "2016-12",      "ref": (date(2016, 12, 1), date(2017, 1, 1))},
+        {"str": "last-week",    "ref": (date(2026, 10, 5), date(2026, 10, 12))},
+        {"str": "this-week",    "ref": (date(2026, 10, 12), date(2026, 10, 19))},
+        {"str": "next-month",   "ref": (date(2026, 11, 1), date(2026, 12, 1))},
+        {"str": "01/03..15/03", "ref": (date(2026, 3, 1), date(2026, 3, 16))},
+        {"str": "2016-02..1/3/16", "ref": (date(2016, 2, 1), date(2016, 3, 2))},
+        {"str": "2016-13",      "ref": IODateExcept},
+        {"str": "1/3/16..foo",  "ref": IODateExcept},
+        {"str": "3/3/16..1/3/16", "ref": IODatesExcept},
+    ]
+
+    # running tests
+    print("[LbkIO] str2range test ..... ", end='')
+    for test in tests:
+
+        try:
+            res = lbkIO.str2range(test['str'], today)
+        except (IODateExcept, IODatesExcept) as e:
+            res = type(e)
+
+        if res != test['ref']:
+            print()
+            print("\"" + test['str'] + "\" input should provide ", end="")
+            print(test['ref'], end=""); print(", got ", end="")
+            print(res, end=""); print(" instead.")
+            print("test [LbkIO, str2range] failed. exit.")
+            sys.exit(exitstatus.ExitStatus.failure)
+
+    # lazy expansion and batch parsing with per-item errors
+    expanded = list(lbkIO.expandRange("28/2/16..1/3/16"))
+    dates, errors = lbkIO.str2dates(["1/2/16", "foo", "2006"], today)
+
+    if expanded != [date(2016, 2, 28), date(2016, 2, 29), date(2016, 3, 1)] or \
+       dates != [date(2016, 2, 1), None, date(2026, 6, 20)] or \
+       [ i for i, e in errors ] != [1]:
+        print()
+        print("range expansion or batch parsing mismatch.")
+        print("test [LbkIO, str2range] failed. exit.")
+        sys.exit(exitstatus.ExitStatus.failure)
+
+    print("ok")
+
+# test template [LbkTemplate] =============================================== #
+
+def test_LbkTemplate():
+    """test single pass template rendering and cache invalidation"""
+
+    print("[LbkTemplate] render test .. ", end='')
+
+    # keys included in other keys and values including keys
+    text = "LBKTITLE, LBKSUBTITLE: LBKTITLELBKTITLE (KEY)"
+    ref = "Book, from KEY: BookBook (x)"
+    keyvalues = [   {"LBKTITLE": "Book", "LBKSUBTITLE": "from KEY", "KEY": "x"},
+                    {"KEY": "x", "LBKSUBTITLE": "from KEY", "LBKTITLE": "Book"} ]
+
+    for keyvalue in keyvalues:
+        res = LbkTemplate(text, keyvalue.keys()).render(keyvalue)
+        if res != ref:
+            print()
+            print("\"" + res + "\" rendered instead of \"" + ref + "\".")
+            print("test [LbkTemplate, render] failed. exit.")
+            sys.exit(exitstatus.ExitStatus.failure)
+
+    # modified template file is compiled again
+    path = os.path.join(os.getcwd(), 'template.tmp')
+    for i, text in enumerate(["first KEY", "second KEY, longer"]):
+
+        with open(path, 'w') as file:
+            file.write(text)
+        os.utime(path, ns=(i, i))
+        
+        res = LbkTemplate.load(path, ["KEY"]).render({"KEY": "x"})
+        if res != text.replace("KEY", "x"):
+            print()
+            print("\"" + res + "\" rendered from outdated template.")
+            print("test [LbkTemplate, load] failed. exit.")
+            sys.exit(exitstatus.ExitStatus.failure)
+
+    os.remove(path)
+    print("ok")
+
+# test parseLog [LbkCompiler] =============================================== #
+
+def test_LbkCompiler_parseLog():
+    """test extraction of errors and warnings from LaTeX log"""
+
+    print("[LbkCompiler] log test ..... ", end='')
+
+    log = os.linesep.join([
+        "(./logs/2015/10/21/log.tex",
+        "LaTeX Warning: Reference `fig:foo_20151021' on page 1 undefined.",
+        "! Undefined control sequence.",
+        "<argument> \\lbkFog",
+        "l.12 \\lbkFog",
+        "Package graphicx Warning: File `foo.png' not found.",
+        "! Emergency stop." ])
+
+    ref = ( ["Undefined control sequence. (line 12)", "Emergency stop."],
+            ["LaTeX Warning: Reference `fig:foo_20151021' on page 1 undefined.",
+             "Package graphicx Warning: File `foo.png' not found."] )
+
+    res = LbkCompiler(os.getcwd()).parseLog(log)
+    if res != ref:
+        print()
+        print(str(res) + " parsed instead of " + str(ref) + ".")
+        print("test [LbkCompiler, parseLog] failed. exit.")
+        sys.exit(exitstatus.ExitStatus.failure)
+
+    print("ok")
+
+# test draft [LbkCompiler] =================================================== #
+
+def test_LbkCompiler_draft():
+    """test figure boxes and draft passes of draft builds"""
+
+    print("[LbkCompiler] draft test ... ", end='')
+
+    root = tempfile.mkdtemp(prefix='lbkdraft-')
+    try:
+        filedata = os.linesep.join([ '\\documentclass{book}',
+                                     '\\usepackage{graphicx}',
+                                     '\\begin{document}', '\\include{log}',
+                                     '\\end{document}', '' ])
+        draftData = LbkFuncs(root=root).draftData(filedata)
+        for name, data in [('main.tex', draftData), ('log.tex', '')]:
+            with open(os.path.join(root, name), 'w') as file:
+                file.write(data)
+
+        # passes of a first build and of a rebuild with settled auxiliary
+        # files, no more than a release build
+        lbkCompiler = LbkCompiler(root, 'stub')
+        passes = []
+        for i in range(2):
+            build = lbkCompiler.compile('main.tex', draft=True)
+            with open(os.path.join(root, build.log)) as file:
+                passes.append([ line.endswith('(draft)') for line in
+                                file.read().splitlines()
+                                if line.startswith('LbkStub') ])
+
+        # table of contents skipped within preamble
+        toc = draftData.find('\\renewcommand{\\tableofcontents}{}')
+
+        if '\\PassOptionsToPackage{draft}{graphicx}' not in draftData or \
+           not 0 <= toc < draftData.find('\\begin{document}') or \
+           passes != [[True, False], [False]] or \
+           not os.path.isfile(os.path.join(root, 'main.pdf')):
+            print()
+            print("draft passes " + str(passes) + " of document:")
+            print(draftData)
+            print("test [LbkCompiler, draft] failed. exit.")
+            sys.exit(exitstatus.ExitStatus.failure)
+
+    finally:
+        shutil.rmtree(root, ignore_errors=True)
+
+    print("ok")
+
 # test LabBook [LabBook] ===================================================== #
 
 def test_LabBook():
     """test process"""
 
     LabBook.main(["init"])
+
+    # build with stub compiler without TeX installation
+    if not shutil.which('pdflatex'):
+        lbkTools = LbkTools(os.path.join(os.getcwd(), 'tpl'), os.getcwd())
+        keyValues = lbkTools.openJsonFile('param.lbk')
+        keyValues['LBKCOMPILER'] = 'stub'
+        lbkTools.saveJsonFile(keyValues, 'param.lbk')
+
     LabBook.main(["-s", "20/10/15", "-e", "22/10/15", "new"])
+    LabBook.main(["--days", "weekends", "-s", "20/10/15", "-e", "25/10/15", "new"])
     LabBook.main(["renew"])
+    LabBook.main(["--jobs", "2", "renew"])
+    LabBook.main(["--force", "renew"])
+    LabBook.main(["-d", "21/10/15", "make"])
     LabBook.main(["-d", "21/10/15", "make"])
+    LabBook.main(["--force", "make"])
+    LabBook.main(["--force", "--trace", "trace.json", "--profile", "make.prof",
+                  "make"])
+    LabBook.main(["--changed", "make"])
+    LabBook.main(["--draft", "make"])
+    LabBook.main(["--split", "month", "--jobs", "2", "--combine", "make"])
     LabBook.main(["remake"])
+    LabBook.main(["history"])
+    LabBook.main(["--dry-run", "clean"])
+    LabBook.main(["clean"])
+    LabBook.main(["--figures", "1", "--lines", "5", "--output", "bench.json",
+                  "bench"])
+    LabBook.main(["--figures", "1", "--lines", "5", "--compare", "bench.json",
+                  "bench"])
+
+# test history [LbkHistory] ================================================= #
+
+def test_LbkHistory():
+    """test phase timing and regression detection of build history"""
+
+    print("[LbkHistory] trend test .... ", end='')
+    lbkHistory = LbkHistory(os.getcwd())
+
+    # overlapping compilations of parallel jobs are counted once
+    events = [ {'name': 'LbkCompiler.compile', 'ts': 0, 'dur': 2e6},
+               {'name': 'LbkCompiler.compile', 'ts': 1e6, 'dur': 2e6},
+               {'name': 'LbkFuncs.mainData', 'ts': 5e6, 'dur': 1e6},
+               {'name': 'LbkTools.render', 'ts': 5e6, 'dur': 5e5},
+               {'name': 'LbkTools.writeFile', 'ts': 7e6, 'dur': 1e6} ]
+    phases = lbkHistory.phases(events)
+
+    # slower builds, first with more entries, then with same entries
+    records = [ {'mode': 'make', 'flags': [], 'status': 'ok', 'wall': 1.0,
+                 'entries': 100, 'phases': {'compile': 0.9}} ] * 3 + \
+              [ {'mode': 'make', 'flags': [], 'status': 'ok', 'wall': 2.0,
+                 'entries': 200, 'phases': {'compile': 1.9}},
+                {'mode': 'make', 'flags': [], 'status': 'ok', 'wall': 6.0,
+                 'entries': 200, 'phases': {'compile': 1.9, 'render': 4.0}},
+                {'mode': 'make', 'flags': [], 'status': 'fail', 'wall': 9.0,
+                 'entries': 200, 'phases': {}} ]
+    messages = lbkHistory.regressions(records)
+
+    if phases != {'compile': 3.0, 'render': 1.0} or \
+       sorted(messages) != [3, 4] or \
+       not messages[3].endswith('compile (content)') or \
+       not messages[4].endswith('render (tooling)'):
+        print()
+        print("phases " + str(phases) + " and regressions " + str(messages) +
+              " mismatch.")
+        print("test [LbkHistory, trend] failed. exit.")
+        sys.exit(exitstatus.ExitStatus.failure)
+
+    print("ok")
+
+# test watch [LbkWatch] ===================================================== #
+
+def test_LbkWatch():
+    """test change detection of logs, templates and parameter file"""
+
+    print("[LbkWatch] watch test ...... ", end='')
+
+    logPath = os.path.join('logs', '2015', '10', '21', 'log.tex')
+    for poll in [False, True]:
+
+        lbkWatch = LbkWatch(os.getcwd(), poll, 0.1)
+        if poll:
+            lbkWatch.source.interval = 0.1
+
+        # a burst of saves, build outputs and generated headers are ignored
+        for path in [ logPath, logPath,
+                      os.path.join('logs', '2015', '10', '22', 'log.aux'),
+                      os.path.join('logs', '2015', '10', '22', 'header.tex'),
+                      os.path.join('tpl', 'header.tex'), 'param.lbk' ]:
+            with open(path, 'a') as file:
+                file.write(os.linesep)
+
+        res = lbkWatch.classify(lbkWatch.wait(5))
+        lbkWatch.close()
+
+        if res != ({date(2015, 10, 21)}, {'header.tex'}, True):
+            print()
+            print(lbkWatch.method + " provides " + str(res) + ".")
+            print("test [LbkWatch, classify] failed. exit.")
+            sys.exit(exitstatus.ExitStatus.failure)
+
+    # new month folder rebuilds every watched entry
+    with tmpProject('lbkwatch-', '20/10/2015', '21/10/2015') as \
+         (lbkProject, output):
+
+        lbkWatch = LbkWatch(lbkProject.root, False, 0.1)
+        os.makedirs(os.path.join(lbkProject.root, 'logs', '2015', '11', '02'))
+        res = lbkWatch.classify(lbkWatch.wait(5))
+        lbkWatch.close()
+
+        rebuilds = []
+        lbkFuncs = LbkFuncs(root=lbkProject.root, echo=lbkProject.echo)
+        lbkFuncs.rebuild = lambda *args: rebuilds.append(args)
+        lbkFuncs.rebuildChanges(None, None, *res)
+
+    if res != (None, set(), False) or rebuilds != [(None, None, None)]:
+        print()
+        print(lbkWatch.method + " provides " + str(res) + " and rebuilds " +
+              str(rebuilds) + " after new month.")
+        print("test [LbkWatch, rebuild] failed. exit.")
+        sys.exit(exitstatus.ExitStatus.failure)
+
+    print("ok")
+
+# test daemon [LbkDaemon] ==================================================== #
+
+def test_LbkDaemon():
+    """test commands served by project daemon and in-process fallback"""
+
+    import subprocess
+
+    print("[LbkDaemon] daemon test .... ", end='')
+
+    script = os.path.join(os.path.dirname(os.path.abspath(__file__)),
+                          'LabBook.py')
+    subprocess.run([sys.executable, script, 'daemon'], check=True,
+                   stdout=subprocess.DEVNULL)
+
+    # served commands and their failure status, then stopped daemon
+    output = io.StringIO()
+    with contextlib.redirect_stdout(output):
+        served = LbkDaemon.forward(['renew'])
+        failed = LbkDaemon.forward(['-d', '1/1/1990', 'make'])
+        stopped = LbkDaemon.send({'stop': True})
+        fallback = LbkDaemon.forward(['renew'])
+
+    if served != 0 or failed != 1 or stopped != 0 or fallback is not None or \
+       "> Renew headers ... ok" not in output.getvalue():
+        print()
+        print("daemon replies " + str([served, failed, stopped, fallback]) +
+              " with output:")
+        print(output.getvalue())
+        print("test [LbkDaemon, forward] failed. exit.")
+        sys.exit(exitstatus.ExitStatus.failure)
+
+    print("ok")
+
+# temporary projects ========================================================= #
+
+@contextlib.contextmanager
+def tmpProject(prefix, start=None, end=None):
+    """LbkProject in a temporary folder removed on exit, with entries between
+       dates if given, yielded with its captured output"""
+
+    root = tempfile.mkdtemp(prefix=prefix)
+    output = io.StringIO()
+    try:
+        with contextlib.redirect_stdout(output):
+            lbkProject = LbkProject(root)
+            if start:
+                lbkProject.init()
+                lbkProject.new(start, end)
+            yield lbkProject, output
+
+    finally:
+        shutil.rmtree(root, ignore_errors=True)
+
+def appendLogs(root, texts):
+    """append texts to log files of October 2015 entries by day, return
+       their paths"""
+
+    paths = {}
+    for day, text in texts.items():
+        paths[day] = os.path.join(root, 'logs', '2015', '10', day, 'log.tex')
+        with open(paths[day], 'a') as file:
+            file.write(text + os.linesep)
+    return paths
+
+# test project [LbkProject] ================================================== #
+
+def test_LbkProject():
+    """test in process API on a project out of working directory"""
+
+    print("[LbkProject] api test ...... ", end='')
+
+    with tmpProject('lbkproject-') as (lbkProject, output):
+
+        root = lbkProject.root
+        lbkProject.init()
+        created = lbkProject.new('20/10/2015', '22/10/2015')
+        skipped = lbkProject.new(date=date(2015, 10, 21), days='weekdays')
+        renewed = lbkProject.renew()
+
+        # hand edited header restored
+        with open(os.path.join(root, 'logs', '2015', '10', '21',
+                               'header.tex'), 'a') as file:
+            file.write('% edited' + os.linesep)
+        restored = lbkProject.renew()
+
+        # template change renewed on watched dates, then on others
+        with open(os.path.join(root, 'tpl', 'header.tex'), 'a') as file:
+            file.write('% changed' + os.linesep)
+        lbkProject.lbkTools.createHeaders([date(2015, 10, 21)])
+        completed = lbkProject.renew()
+        made = lbkProject.make(compiler='stub')
+        upToDate = lbkProject.make(compiler='stub')
+
+        # combined shards kept apart from full build previewed from
+        lbkProject.make(compiler='stub', split='month', combine=True)
+        changed = lbkProject.make(compiler='stub', changed=True)
+        cleaned = lbkProject.clean(dry_run=True)
+
+        # typed exceptions instead of exits
+        errors = []
+        for call, kwargs, excepts in [
+                (lbkProject.make, {'date': '1/1/1990'}, DoNothingExcept),
+                (lbkProject.make, {'date': '32/1/2015'}, IODateExcept),
+                (lbkProject.new, {}, IONewExcept),
+                (lbkProject.make, {'stop': True}, IOFlagExcept) ]:
+            try:
+                call(**kwargs)
+                errors.append(call.__name__ + str(kwargs))
+            except excepts:
+                pass
+
+        # invalid timeout of parameter file reported as the option is
+        paramPath = os.path.join(root, 'param.lbk')
+        with open(paramPath) as file:
+            param = json.load(file)
+        with open(paramPath, 'w') as file:
+            json.dump(dict(param, LBKTIMEOUT='soon'), file)
+        try:
+            lbkProject.make(compiler='stub', force=True)
+            errors.append('make with LBKTIMEOUT soon')
+        except DoNothingExcept:
+            pass
+
+    if len(created.created) != 3 or skipped.skipped != [date(2015, 10, 21)] \
+       or renewed.total != 3 or restored.written != 1 or \
+       completed.written != 2 or len(made.builds) != 1 or \
+       made.builds[0].status != 0 or \
+       len(made.pdfs) != 1 or not made.pdfs[0].startswith(root) or \
+       upToDate.builds or not upToDate.upToDate or changed.builds or \
+       not cleaned.dryRun or not cleaned.files or \
+       errors or output.getvalue():
+        print()
+        print("results " + str([created, skipped, renewed, restored,
+                                completed, made, upToDate, changed,
+                                cleaned]) +
+              ", unraised " + str(errors) + " and output " +
+              repr(output.getvalue()) + " mismatch.")
+        print("test [LbkProject, api] failed. exit.")
+        sys.exit(exitstatus.ExitStatus.failure)
+
+    print("ok")
+
+# test build commands [LbkFuncs] ============================================= #
+
+def test_LbkFuncs():
+    """test results of build commands on a project spanning two months"""
+
+    print("[LbkFuncs] build test ...... ", end='')
+    with tmpProject('lbkfuncs-', '30/10/2015', '2/11/2015') as \
+         (lbkProject, output):
+
+        root = lbkProject.root
+
+        # changed template renewed on every entry by parallel jobs, unchanged
+        # one only when forced
+        with open(os.path.join(root, 'tpl', 'header.tex'), 'a') as file:
+            file.write('% changed' + os.linesep)
+        renewed = [ lbkProject.renew(jobs=2), lbkProject.renew(jobs=2),
+                    lbkProject.renew(force=True) ]
+
+        # compiler skipped on second build unless forced
+        made = [ lbkProject.make(compiler='stub'),
+                 lbkProject.make(compiler='stub'),
+                 lbkProject.make(compiler='stub', force=True) ]
+
+        # preview of edited entry only
+        appendLogs(root, {'31': 'edited'})
+        changed = lbkProject.make(compiler='stub', changed=True)
+        with open(os.path.join(root, 'myFileName-changed.tex')) as file:
+            includes = [ line.strip() for line in file
+                         if line.startswith('\\includeonly') ]
+
+        # draft kept apart from release pdf file
+        draft = lbkProject.make(compiler='stub', draft=True)
+
+        # shard of edited entry rebuilt alone, then combined again
+        lbkProject.make(compiler='stub', split='month', combine=True, jobs=2)
+        appendLogs(root, {'30': 'edited'})
+        sharded = lbkProject.make(compiler='stub', split='month',
+                                  combine=True, jobs=2)
+
+        # weekend entries added next to existing ones
+        added = lbkProject.new('1/11/2015', '9/11/2015', days='weekends')
+
+        # artwork of figs folders kept by deep clean
+        figPath = os.path.join(root, 'logs', '2015', '10', '31', 'figs',
+                               'plot.log')
+        with open(figPath, 'w') as file:
+            file.write('artwork' + os.linesep)
+        cleaned = [ lbkProject.clean(dry_run=True),
+                    lbkProject.clean(deep=True, dry_run=True) ]
+        kept = os.path.isfile(os.path.join(root, 'myFileName.pdf'))
+        cleaned.append(lbkProject.clean(deep=True))
+        left = sorted( name for name in os.listdir(root)
+                       if not name.startswith('.') ) + \
+               [ path for path in [figPath] if os.path.isfile(path) ]
+
+    if renewed != [(4, 4), (0, 4), (4, 4)]:
+        print()
+        print("renewed headers " + str(renewed) + " mismatch.")
+        print("test [LbkFuncs, renew] failed. exit.")
+        sys.exit(exitstatus.ExitStatus.failure)
+
+    if [ len(make.builds) for make in made ] != [1, 0, 1] or \
+       made[1].upToDate != ['myFileName.tex']:
+        print()
+        print("builds " + str(made) + " mismatch.")
+        print("test [LbkFuncs, make] failed. exit.")
+        sys.exit(exitstatus.ExitStatus.failure)
+
+    if len(changed.builds) != 1 or \
+       includes != ['\\includeonly{logs/2015/10/31/log}']:
+        print()
+        print("changed build " + str(changed) + " with " + str(includes) +
+              " mismatch.")
+        print("test [LbkFuncs, changed] failed. exit.")
+        sys.exit(exitstatus.ExitStatus.failure)
+
+    if len(draft.builds) != 1 or \
+       draft.pdfs != [os.path.join(root, 'myFileName-draft.pdf')]:
+        print()
+        print("draft build " + str(draft) + " mismatch.")
+        print("test [LbkFuncs, draft] failed. exit.")
+        sys.exit(exitstatus.ExitStatus.failure)
+
+    if [ build.log for build in sharded.builds ] != \
+       [ os.path.join('.lbk', 'build', 'myFileName-' + name + '.log')
+         for name in ['2015-10', 'combined'] ] or \
+       sharded.upToDate != [ os.path.join('.lbk', 'shards', '2015-11',
+                                          'myFileName-2015-11.tex') ]:
+        print()
+        print("sharded build " + str(sharded) + " mismatch.")
+        print("test [LbkFuncs, split] failed. exit.")
+        sys.exit(exitstatus.ExitStatus.failure)
+
+    if added != ([date(2015, 11, 7), date(2015, 11, 8)],
+                 [date(2015, 11, 1)]):
+        print()
+        print("weekend entries " + str(added) + " mismatch.")
+        print("test [LbkFuncs, new] failed. exit.")
+        sys.exit(exitstatus.ExitStatus.failure)
+
+    if not kept or not cleaned[0].files or \
+       [ clean.files for clean in cleaned ] != 3*[cleaned[0].files] or \
+       [ clean.dryRun for clean in cleaned ] != [True, True, False] or \
+       left != ['logs', 'param.lbk', 'tpl', figPath]:
+        print()
+        print("cleans " + str(cleaned) + " leaving " + str(left) +
+              " mismatch.")
+        print("test [LbkFuncs, clean] failed. exit.")
+        sys.exit(exitstatus.ExitStatus.failure)
+
+    print("ok")
+
+# test benchmark [LbkBench] ================================================== #
+
+def test_LbkBench():
+    """test saved and compared benchmark results"""
+
+    print("[LbkBench] bench test ...... ", end='')
+    lines, output = [], io.StringIO()
+    path = os.path.join(tempfile.mkdtemp(prefix='lbkbench-'), 'bench.json')
+    echo = lambda text, end=os.linesep: lines.append(text + end)
+
+    try:
+        with contextlib.redirect_stdout(output):
+            flags = {Flag.lines: 5, Flag.output: path}
+            saved = LbkFuncs(flags, echo=echo).bench(None, None)
+            del lines[:]
+            flags = {Flag.lines: 5, Flag.compare: path}
+            compared = LbkFuncs(flags, echo=echo).bench(None, None)
+        loaded = LbkBench.load(path)
+
+    finally:
+        shutil.rmtree(os.path.dirname(path), ignore_errors=True)
+
+    # every timing reported then compared to saved one, through echo only
+    names = list(compared['timings'])
+    report = ''.join(lines).splitlines()
+    if loaded != saved or names != list(saved['timings']) or \
+       len(report) != 2*len(names) + 1 or \
+       report[len(names)] != "> Compare with " + str(saved['revision']) + \
+                             " ... ok." or output.getvalue():
+        print()
+        print("results " + str([saved, compared, loaded]) + ", lines " +
+              str(report) + " and output " + repr(output.getvalue()) +
+              " mismatch.")
+        print("test [LbkBench, compare] failed. exit.")
+        sys.exit(exitstatus.ExitStatus.failure)
+
+    print("ok")
+
+# test batch [LbkBatch] ====================================================== #
+
+def test_LbkBatch():
+    """test command run on several projects by worker processes"""
+
+    print("[LbkBatch] batch test ...... ", end='')
+
+    with tmpProject('lbkbatch-') as (lbkProject, output):
+
+        # two projects with entries, one without, and a plain folder
+        tmpDir = lbkProject.root
+        for name in ['lab1', 'lab2', 'lab3']:
+            project = LbkProject(os.path.join(tmpDir, name))
+            project.init()
+            if name != 'lab3':
+                project.new('20/10/2015', '22/10/2015')
+        os.makedirs(os.path.join(tmpDir, 'other'))
+
+        LabBook.main([ '--compiler', 'stub', '--jobs', '2', 'batch',
+                       'make', os.path.join(tmpDir, 'lab*'),
+                       os.path.join(tmpDir, 'lab1') ])
+
+        # commands and options checked before running
+        refused = []
+        for argv in [ ['batch', 'new', tmpDir],
+                      ['batch', 'make'],
+                      ['--deep', 'batch', 'make', tmpDir] ]:
+            try:
+                LabBook.main(argv)
+            except SystemExit:
+                refused.append(argv)
+
+        roots, unmatched = LbkBatch.expand([ os.path.join(tmpDir, '*') ])
+        pdfs = [ os.path.isfile(os.path.join(tmpDir, name, 'myFileName.pdf'))
+                 for name in ['lab1', 'lab2', 'lab3'] ]
+
+    if pdfs != [True, True, False] or len(refused) != 3 or \
+       len(roots) != 3 or unmatched or \
+       "> 2 ok, 1 skipped, 0 failed" not in output.getvalue():
+        print()
+        print("pdf files " + str(pdfs) + ", projects " + str(roots) +
+              " and output mismatch:")
+        print(output.getvalue())
+        print("test [LbkBatch, make] failed. exit.")
+        sys.exit(exitstatus.ExitStatus.failure)
+
+    print("ok")
+
+# test store [LbkStore] ====================================================== #
+
+def test_LbkStore():
+    """test projects provisioned from a shared template store"""
+
+    import stat
+
+    print("[LbkStore] store test ...... ", end='')
+
+    with tmpProject('lbkstore-') as (lbkProject, output):
+
+        tmpDir = lbkProject.root
+        store = os.path.join(tmpDir, 'store')
+        shutil.copytree(os.path.join(os.path.dirname(
+                            os.path.abspath(__file__)), 'tpl'), store)
+        projectsPath = os.path.join(tmpDir, 'projects.csv')
+        with open(projectsPath, 'w') as file:
+            file.write('folder,LBKAUTHOR,LBKTITLE' + os.linesep +
+                       os.path.join(tmpDir, 'lab1') + ',Ada,Optics' +
+                       os.linesep + os.path.join(tmpDir, 'lab2') + ',,' +
+                       os.linesep)
+
+        first = lbkProject.init(store=store, projects=projectsPath)
+        again = lbkProject.init(store=store, projects=projectsPath)
+
+        # templates edited in place by a project only
+        storeMode = os.stat(os.path.join(store, 'log.tex')).st_mode
+        with open(os.path.join(tmpDir, 'lab2', 'tpl', 'log.tex'),
+                  'a') as file:
+            file.write('% edited' + os.linesep)
+
+        param = LbkTools(store, tmpDir).openJsonFile(
+                    os.path.join(tmpDir, 'lab1', 'param.lbk'))
+        with open(os.path.join(store, 'log.tex')) as file:
+            storeLog = file.read()
+
+    if len(first.created) != 2 or len(again.skipped) != 2 or \
+       first.files['clone'] + first.files['copy'] != 6 or \
+       param['LBKAUTHOR'] != 'Ada' or param['LBKFILENAME'] != 'myFileName' \
+       or '% edited' in storeLog or not storeMode & stat.S_IWUSR:
+        print()
+        print("provisioning " + str([first, again]) +
+              " with parameters " + str(param) + " mismatch.")
+        print("test [LbkStore, provision] failed. exit.")
+        sys.exit(exitstatus.ExitStatus.failure)
+
+    print("ok")
+
+# test search [LbkSearch] ==================================================== #
+
+def test_LbkSearch():
+    """test search of words and phrases with incremental index"""
+
+    print("[LbkSearch] search test .... ", end='')
+
+    with tmpProject('lbksearch-', '20/10/2015', '22/10/2015') as \
+         (lbkProject, output):
+
+        root = lbkProject.root
+        appendLogs(root, { '20': 'Laser \\textbf{alignment} done % beam dump',
+                           '21': 'Alignment of the laser \\lbkFig{beam}{Beam}',
+                           '22': '\\begin{itemize} \\item sample holder ' +
+                                 '\\end{itemize}' })
+
+        found = [ [ date.day for date in lbkProject.search(terms, start) ]
+                  for terms, start in [ (['laser'], None),
+                                        (['laser alignment'], None),
+                                        (['laser', 'beam'], None),
+                                        (['laser'], '21/10/2015'),
+                                        (['sample holder'], None) ] ]
+
+        # missing words, LaTeX markup and comments are not searched
+        missing = 0
+        for terms in [ ['dump'], ['itemize'], ['alignment laser'] ]:
+            try:
+                lbkProject.search(terms)
+            except DoNothingExcept:
+                missing += 1
+
+        # edited and removed entries
+        appendLogs(root, { '22': 'laser cleaned' })
+        shutil.rmtree(os.path.join(root, 'logs', '2015', '10', '20'))
+        updated = [ date.day for date in lbkProject.search(['laser']) ]
+
+    if found != [[20, 21], [20], [21], [21], [22]] or missing != 3 or \
+       updated != [21, 22]:
+        print()
+        print("found " + str(found) + ", " + str(missing) +
+              " missing and " + str(updated) + " after update mismatch.")
+        print("test [LbkSearch, query] failed. exit.")
+        sys.exit(exitstatus.ExitStatus.failure)
+
+    print("ok")
+
+# test check [LbkCheck] ====================================================== #
+
+def test_LbkCheck():
+    """test references and figures check with cached scans"""
+
+    print("[LbkCheck] check test ...... ", end='')
+
+    with tmpProject('lbkcheck-', '20/10/2015', '21/10/2015') as \
+         (lbkProject, output):
+
+        root = lbkProject.root
+        figs = os.path.join(root, 'logs', '2015', '10', '20', 'figs')
+        for name in ['beam.png', 'spot.png', 'spot.pdf']:
+            open(os.path.join(figs, name), 'w').close()
+
+        logs = appendLogs(root, {
+            '20': '\\lbkFig{beam}{Beam} \\lbkRef{fig:beam}' + os.linesep +
+                  '\\lbkFig[0.5]{spot}{Spot} % \\lbkFig{hidden}{Hidden}',
+            '21': '\\ref{sec:20151020} \\lbkRef{fig:beam}' + os.linesep +
+                  '\\lbkFig{lost}{Lost}' })
+
+        # warnings only on first entry, errors raised on second one
+        warnings = [ problem.message.split()[0] for problem in
+                     lbkProject.check(date='20/10/2015') ]
+        try:
+            lbkProject.check()
+            errors = None
+        except CheckExcept as e:
+            errors = e.args[0]
+
+        # cached scans until a log changes
+        with open(logs['21'], 'w') as file:
+            file.write('\\ref{sec:20151020}' + os.linesep)
+        lbkCheck = LbkCheck(lbkProject.lbkTools)
+        dates = lbkProject.lbkTools.getLogDates()
+        fixed = lbkCheck.check(dates, dates)
+
+    if warnings != ['ambiguous'] or errors != 2 or \
+       [ problem.level for problem in fixed ] != ['warning'] or \
+       lbkCheck.scanned != 1:
+        print()
+        print("warnings " + str(warnings) + ", " + str(errors) +
+              " errors, " + str(fixed) + " and " +
+              str(lbkCheck.scanned) + " scanned after fix mismatch.")
+        print("test [LbkCheck, check] failed. exit.")
+        sys.exit(exitstatus.ExitStatus.failure)
+
+    print("ok")
+
+# test startup [LabBook] ===================================================== #
+
+def importTimes(args):
+    """get imported modules and total import time in us of a python run"""
+
+    import subprocess
+
+    process = subprocess.run( [sys.executable, '-X', 'importtime'] + args,
+                              stdout=subprocess.DEVNULL,
+                              stderr=subprocess.PIPE, universal_newlines=True )
+
+    modules, total = set(), 0
+    for line in process.stderr.splitlines():
+        fields = line.split('|')
+        if len(fields) != 3 or not fields[1].strip().isdigit():
+            continue
+        modules.add(fields[2].strip())
+        # top level imports include nested ones
+        if not fields[2].startswith('  '):
+            total += int(fields[1])
+
+    return modules, total
+
+def test_LabBook_startup():
+    """test that commands load lazily within startup budget"""
+
+    # import time budget on top of bare interpreter in us
+    budget = 50000
+    # modules only needed once a mode is dispatched
+    heavy = [ 'LbkFuncs', 'LbkTests', 'LbkCompiler', 'subprocess',
+              'distutils', 'pprint' ]
+
+    print("[LabBook] startup test ..... ", end='')
+    script = os.path.join(os.path.dirname(os.path.abspath(__file__)),
+                          'LabBook.py')
+
+    # best of a few runs against noise
+    elapsed = []
+    for i in range(3):
+        modules, total = importTimes([script, '-h'])
+        elapsed.append(total - importTimes(['-c', 'pass'])[1])
+
+    loaded = [ module for module in heavy if module in modules ]
+
+    # watch mode loads compiler only once building
+    modules = importTimes(['-c', 'import sys; sys.path.insert(0, ' +
+                           repr(os.path.dirname(script)) +
+                           '); import LbkWatch'])[0]
+    if 'LbkCompiler' in modules:
+        loaded.append('LbkCompiler')
+    if loaded or min(elapsed) > budget:
+        print()
+        print("startup imports " + ", ".join(loaded) + " and takes " +
+              str(min(elapsed) // 1000) + " ms for a budget of " +
+              str(budget // 1000) + " ms.")
+        print("test [LabBook, startup] failed. exit.")
+        sys.exit(exitstatus.ExitStatus.failure)
+
+    print("ok")
+
+# test index [LbkIndex] ===================================================== #
+
+def test_LbkIndex():
+    """test index refresh against a full scan of log directory"""
+
+    print("[LbkIndex] index test ...... ", end='')
+
+    # reference dates from a full scan
+    def scan():
+        root = os.path.join(os.getcwd(), 'logs')
+        return sorted(  datetime.strptime(path[len(root)+1:], 
+                                          os.path.join('%Y','%m','%d')).date()
+                        for path, dirs, files in os.walk(root)
+                        if len(path[len(root)+1:]) == 10 )
+
+    # entry created beside one the index has not seen yet, month mtime being
+    # set apart from indexed one
+    handPath = os.path.join('logs', '2015', '10', '27')
+    def addBeside():
+        lbkTools = LbkTools(os.path.join(os.getcwd(), 'tpl'), os.getcwd())
+        lbkTools.lbkIndex.dates()
+        os.makedirs(handPath)
+        os.utime(os.path.dirname(handPath), ns=(0, 0))
+        lbkTools.createEntries([date(2015, 10, 28)])
+
+    def removeBeside():
+        for day in ['27', '28']:
+            shutil.rmtree(os.path.join('logs', '2015', '10', day))
+
+    # fresh index, reloaded index, new and removed entries
+    newPath = os.path.join('logs', '2016', '02', '29')
+    steps = [   ("fresh index", lambda: None),
+                ("reloaded index", lambda: None),
+                ("new entry", lambda: os.makedirs(newPath)),
+                ("removed entry", lambda: os.removedirs(newPath)),
+                ("entry beside unindexed one", addBeside),
+                ("removed entries", removeBeside) ]
+
+    for name, step in steps:
+
+        step()
+        res = list(LbkIndex(os.getcwd()).dates())
+
+        if res != scan():
+            print()
+            print(name + " provides ", end="")
+            print([ LbkIO.date2str(d) for d in res ], end="")
+            print(" instead of ", end="")
+            print([ LbkIO.date2str(d) for d in scan() ])
+            print("test [LbkIndex, dates] failed. exit.")
+            sys.exit(exitstatus.ExitStatus.failure)
+
+    # range selections against a linear filter
+    dates = LbkIndex(os.getcwd()).dates()
+    bounds = [None] + [ date(2015, 10, day) for day in range(19, 24) ]
+    for start in bounds:
+        for end in bounds:
+
+            ref = [ d for d in scan() if (start is None or start <= d) and
+                                         (end is None or d < end) ]
+            res = list(dates.select(start, end))
+
+            if res != ref:
+                print()
+                print("selection from " + str(start) + " to " + str(end), end="")
+                print(" provides " + str(res) + " instead of " + str(ref))
+                print("test [LbkIndex, select] failed. exit.")
+                sys.exit(exitstatus.ExitStatus.failure)
+
+    print("ok")
 
 # Main test function ========================================================= #
 
@@ -122,7 +1050,23 @@ def tests(startDate, endDate):
     assert(startDate == None and endDate == None)
 
     test_LbkIO_str2date()
+    test_LbkIO_str2range()
+    test_LbkTemplate()
+    test_LbkCompiler_parseLog()
+    test_LbkCompiler_draft()
     test_LabBook()
+    test_LbkHistory()
+    test_LbkWatch()
+    test_LbkDaemon()
+    test_LbkProject()
+    test_LbkFuncs()
+    test_LbkBench()
+    test_LbkBatch()
+    test_LbkStore()
+    test_LbkSearch()
+    test_LbkCheck()
+    test_LabBook_startup()
+    test_LbkIndex()
 
 if __name__ == "__main__":
    
@@ -1,15 +1,22 @@
 #! /usr/local/bin/python3
 # -*- coding: utf-8 -*-
 
+import copy
+import hashlib
 import io
 import json
 import os
-import shutil
 import datetime
-import pprint
+
+from LbkIndex import LbkIndex
+from LbkTemplate import LbkTemplate
+from LbkTrace import traced
 
 from LbkExceptions import InternalExcept
 
+# parsed JSON files: path -> (mtime, size, data)
+jsonCache = {}
+
 class LbkTools:
     """tools for LabBook main functions"""
 
@@ -20,25 +27,46 @@ class LbkTools:
         self.ctd = ctd
         # current working directory
         self.cwd = cwd
+        # log entry index
+        self.lbkIndex = LbkIndex(cwd)
+
+
+    @traced()
+    def render(self, src, keyvalues):
+        """render src template with values replacing keys"""
+
+        values = {  key: ''.join(value) if isinstance(value, (list, tuple))
+                         else value
+                    for key, value in keyvalues.items() }
+
+        template = LbkTemplate.load(os.path.join(self.ctd, src), values.keys())
+        return template.render(values)
 
 
-    def replace(self, src, dest, keyvalues):
-        """replace key by value in src file to dest file"""
+    def insertPreamble(self, filedata, preamble):
+        """insert LaTeX code at the end of main file preamble"""
 
-        # open source file        
-        filedata = None
-        with open(os.path.join(self.ctd, src), 'r') as file :
-            filedata = file.read()
+        idx = filedata.find('\\begin{document}')
+        if idx < 0:
+            raise InternalExcept("[LbkTools, insertPreamble]")
 
-        # Replace key in src by value in dest
-        for key, value in keyvalues.items():
-            if isinstance(value, (list, tuple)):
-                filedata = filedata.replace(key, ''.join(value))
-            else :
-                filedata = filedata.replace(key, value)
+        return filedata[:idx] + preamble + os.linesep + filedata[idx:]
 
-        # Write dest
-        with open(os.path.join(self.cwd, dest), 'w') as file:
+
+    @traced()
+    def writeFile(self, dest, filedata):
+        """write dest file unless it already holds the same data"""
+
+        path = os.path.join(self.cwd, dest)
+        try:
+            with open(path, 'r') as file:
+                if file.read() == filedata:
+                    return
+
+        except OSError:
+            pass
+
+        with open(path, 'w') as file:
             file.write(filedata)
 
 
@@ -58,44 +86,55 @@ class LbkTools:
         return pathOS, pathLX
 
 
+    @traced()
     def getLogDates(self, startDate = None, endDate = None):
         """list available log between start and end date"""
 
         # List available logs
-        root = os.path.join(self.cwd,'logs')
-        idx = len( os.path.join(root, '') )
-        form = os.path.join('%Y','%m','%d');
-        avLogs = [datetime.datetime.strptime(subpath[0][idx:], form).date()
-                for subpath in os.walk(root) 
-                if len(subpath[0][idx:])==len( os.path.join('YYYY','MM','DD')) ]
+        avLogs = self.lbkIndex.dates()
 
         # Select dates between start and end dates
-        dates = list()
+        if not all( date is None or isinstance(date, datetime.date)
+                    for date in (startDate, endDate) ):
+            raise InternalExcept("[LbkTools, getLogDates]")
 
-        if   startDate == None and endDate == None:
-            
-            dates = avLogs
+        dates = avLogs.select(startDate, endDate)
 
-        elif isinstance(startDate, datetime.date) and \
-             endDate == None:
+        return dates
 
-            dates = [ date for date in avLogs if startDate <= date ]
 
-        elif startDate == None and \
-             isinstance(endDate, datetime.date):
+    def getEntrySignature(self, date):
+        """get digest of paths, sizes and mtimes of all log entry inputs"""
 
-            dates = [ date for date in avLogs if date < endDate ]
+        # build artifacts are not inputs
+        exts = ('.aux', '.toc', '.lof', '.log', '.out', '.gz')
 
-        elif isinstance(startDate, datetime.date) and \
-             isinstance(endDate, datetime.date):
+        pathOS = self.getLogPath(date)[0]
+        stats = []
+        for root, dirs, files in os.walk(os.path.join(self.cwd, pathOS)):
+            dirs.sort()
+            for file in sorted(files):
+                if not file.lower().endswith(exts):
+                    stat = os.stat(os.path.join(root, file))
+                    stats.append(( os.path.relpath(os.path.join(root, file),
+                                                   self.cwd),
+                                   stat.st_mtime_ns, stat.st_size ))
 
-            dates = [   date for date in avLogs \
-                        if startDate <= date and date < endDate ]
+        return hashlib.sha1(json.dumps(stats).encode()).hexdigest()
 
-        else:
-            raise InternalExcept("[LbkTools, getLogDates]")
 
-        return dates
+    @traced()
+    def getFingerprint(self, dates, filedata, extra=None):
+        """get digest of main file data and log entry inputs, 
+           return digest and signature of each entry"""
+
+        entries = { self.latexPath(self.getLogPath(date)[0].split(os.sep)[1:]):
+                    self.getEntrySignature(date) for date in dates }
+
+        fingerprint = hashlib.sha1(json.dumps( [ filedata,
+                                                 sorted(entries.items()),
+                                                 extra ] ).encode())
+        return fingerprint.hexdigest(), entries
 
 
     def latexPath(self, pathList):
@@ -103,13 +142,23 @@ class LbkTools:
         return '/'.join(pathList)
 
 
+    @traced()
     def openJsonFile(self, path ):
-        """open Json file and return dictionary."""
+        """open Json file and return dictionary, parsed again only if file
+           has changed"""
         
         # check that path exists
-        if not os.path.exists(path):
+        try:
+            stat = os.stat(path)
+        except OSError:
             raise InternalExcept("[LbkTools, openJsonFile]")
 
+        # callers may modify their dictionary
+        cacheKey = os.path.abspath(path)
+        cached = jsonCache.get(cacheKey)
+        if cached and cached[0:2] == (stat.st_mtime_ns, stat.st_size):
+            return copy.deepcopy(cached[2])
+
         # Loading data file. 
         jsonData = io.StringIO()
     
@@ -121,8 +170,11 @@ class LbkTools:
 
         # Creating Json dictionary.
         jsonData.seek(0)
-        return json.load(jsonData)
+        data = json.load(jsonData)
+        jsonCache[cacheKey] = (stat.st_mtime_ns, stat.st_size, data)
+        return copy.deepcopy(data)
 
+    @traced()
     def saveJsonFile(self, jsonData, path ):
         """save data dictionary within a JSON file"""
 
@@ -132,8 +184,107 @@ class LbkTools:
                         indent=4, separators=(',', ': '))
 
 
-    def createHeader(self, date, pathOS, pathLX):
-        """create LaTeX header at a given date"""
+    @traced()
+    def openCache(self, name):
+        """open project cache file and return dictionary, empty if missing"""
+
+        try:
+            with open(os.path.join(self.cwd, '.lbk', name)) as cacheFile:
+                return json.load(cacheFile)
+
+        except (OSError, ValueError):
+            return {}
+
+    @traced()
+    def saveCache(self, name, data):
+        """save dictionary within a project cache file"""
+
+        self.dumpJson(os.path.join(self.cwd, '.lbk', name), data)
+
+    @staticmethod
+    def dumpJson(path, data):
+        """save data within a JSON file, creating its folder"""
+
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+
+        # write in a temporary file and swap to avoid partial file
+        with open(path + '.tmp', 'w') as jsonFile:
+            json.dump(data, jsonFile)
+        os.replace(path + '.tmp', path)
+
+    @traced()
+    def addArtifacts(self, paths):
+        """record build artifacts in project manifest"""
+
+        manifest = self.openCache('artifacts.json')
+        files = set(manifest.get('files', [])) | set(paths)
+        self.saveCache('artifacts.json', {'files': sorted(files)})
+
+    @traced()
+    def scanArtifacts(self):
+        """list build artifacts by scanning project without figs folders"""
+
+        # extensions of file to delete
+        exts = ('.aux', '.toc', '.lof', '.log', '.out', '.gz')
+
+        # pdf and tex files in current working directory
+        paths = [ entry.name for entry in os.scandir(self.cwd)
+                  if entry.is_file() and entry.name.endswith(('.tex', '.pdf')) ]
+
+        # non user files everywhere, figs folders only hold artwork
+        dirs = ['']
+        while dirs:
+            path = dirs.pop()
+            with os.scandir(os.path.join(self.cwd, path)) as entries:
+                for entry in entries:
+                    if entry.is_dir(follow_symlinks=False):
+                        if entry.name != 'figs':
+                            dirs.append(os.path.join(path, entry.name))
+                    elif entry.name.lower().endswith(exts):
+                        paths.append(os.path.join(path, entry.name))
+
+        return paths
+
+    @traced()
+    def removeArtifacts(self, paths, dryRun=False):
+        """remove build artifacts and empty shard folders, return number of
+           removed files and their size in bytes"""
+
+        count, size = 0, 0
+        for path in sorted(set(paths)):
+            try:
+                size += os.stat(os.path.join(self.cwd, path)).st_size
+                if not dryRun:
+                    os.remove(os.path.join(self.cwd, path))
+                count += 1
+            except FileNotFoundError:
+                pass
+
+        if not dryRun:
+
+            # empty shard output folders
+            shards = os.path.join(self.cwd, '.lbk', 'shards')
+            for root, dirs, files in os.walk(shards, topdown=False):
+                if not files:
+                    try:
+                        os.rmdir(root)
+                    except OSError:
+                        pass
+
+            self.saveCache('artifacts.json', {'files': []})
+
+        return count, size
+
+    @staticmethod
+    def hashFile(path):
+        """get sha1 digest of file content"""
+
+        with open(path, 'rb') as file:
+            return hashlib.sha1(file.read()).hexdigest()
+
+
+    def renderHeader(self, date, pathLX):
+        """render LaTeX header at a given date"""
 
         # Copy, replace and paste for header file
         stampDate = ''.join([   str(date.year),
@@ -148,19 +299,105 @@ class LbkTools:
                         'LBKFIGPATH': figPathDate,
                         'LBKSECTION': titleDate}
                         
-        self.replace(  'header.tex',
-                        os.path.join(pathOS, "header.tex"),
-                        keyvalues )
+        return self.render('header.tex', keyvalues)
 
 
-    def createLog(self, date, pathOS, pathLX):
-        """create LaTeX log at a given date"""
+    def renderLog(self, date, pathLX):
+        """render LaTeX log at a given date"""
 
         # Copy, replace and paste for log file
         keyvalues ={ 'LBKPATH': self.latexPath([ pathLX,'header']) }
 
-        self.replace(  'log.tex',
-                        os.path.join(pathOS, "log.tex"),
-                        keyvalues )
-
-
+        return self.render('log.tex', keyvalues)
+
+
+    @traced()
+    def createEntries(self, dates):
+        """create log folders with figs folder, header and log files for
+           dates without entry and record them in index"""
+
+        with self.lbkIndex.adding(dates):
+            for date in dates:
+
+                pathOS, pathLX = self.getLogPath(date)
+                path = os.path.join(self.cwd, pathOS)
+                os.makedirs(os.path.join(path, 'figs'))
+
+                with open(os.path.join(path, "header.tex"), 'w') as file:
+                    file.write(self.renderHeader(date, pathLX))
+                with open(os.path.join(path, "log.tex"), 'w') as file:
+                    file.write(self.renderLog(date, pathLX))
+
+
+    @staticmethod
+    def statFile(path):
+        """get mtime and size of a file, None if missing"""
+
+        try:
+            stat = os.stat(path)
+        except OSError:
+            return None
+        return [stat.st_mtime_ns, stat.st_size]
+
+
+    @traced()
+    def createHeaders(self, dates, jobs=1, force=False):
+        """create LaTeX headers whose content has changed with parallel jobs,
+           return errors and number of written headers"""
+
+        # header manifest: hash of template rendered, mtime and size of each
+        # header, entries being recorded one by one so that renewing some
+        # dates leaves others to be renewed
+        manifest = self.openCache('headers.json')
+        entries = manifest.get('entries', {})
+        tplHash = self.hashFile(os.path.join(self.ctd, 'header.tex'))
+
+        # run every entry and keep results in date order
+        def createOne(date):
+            pathOS, pathLX = self.getLogPath(date)
+            path = os.path.join(self.cwd, pathOS, "header.tex")
+            key = self.latexPath(pathOS.split(os.sep)[1:])
+            stat = self.statFile(path)
+
+            try:
+                # same template and header untouched since rendered
+                if not force and stat and entries.get(key) == [tplHash] + stat:
+                    return key, entries[key], False, None
+
+                # header edited, missing or not in manifest: render it and
+                # compare with header on disk
+                filedata = self.renderHeader(date, pathLX)
+                if not force and stat:
+                    with open(path) as file:
+                        if file.read() == filedata:
+                            return key, [tplHash] + stat, False, None
+
+                with open(path, 'w') as file:
+                    file.write(filedata)
+                return key, [tplHash] + self.statFile(path), True, None
+
+            except Exception as e:
+                return key, None, False, (date, e)
+
+        if jobs > 1 and len(dates) > 1:
+            import concurrent.futures
+            with concurrent.futures.ThreadPoolExecutor(jobs) as executor:
+                results = list(executor.map(createOne, dates))
+        else:
+            results = [ createOne(date) for date in dates ]
+
+        # merge entries into manifest, forgetting removed entries
+        keys = { self.latexPath(self.getLogPath(date)[0].split(os.sep)[1:])
+                 for date in self.getLogDates() }
+        entries = { key: entry for key, entry in entries.items()
+                    if key in keys }
+        for key, entry, written, error in results:
+            if entry:
+                entries[key] = entry
+            else:
+                entries.pop(key, None)
+        self.saveCache('headers.json', { 'entries': entries })
+
+        errors = [ error for key, entry, written, error in results if error ]
+        written = sum( 1 for result in results if result[2] )
+        return errors, written
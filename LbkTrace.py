@@ -0,0 +1,133 @@
+#! /usr/local/bin/python3
+# -*- coding: utf-8 -*-
+
+import contextlib
+import functools
+import json
+import os
+import threading
+import time
+
+class LbkTrace:
+    """recorder of named timing spans in Chrome trace event format"""
+
+    def __init__(self):
+        """LbkTrace class constructor"""
+
+        # complete events, one per span
+        self.events = []
+        # spans are recorded from compilation threads too
+        self.lock = threading.Lock()
+        # trace time origin
+        self.origin = time.perf_counter()
+        # current process
+        self.pid = os.getpid()
+
+    def add(self, name, cat, start, end, args):
+        """record span between two perf_counter values"""
+
+        event = { 'name': name, 'cat': cat, 'ph': 'X',
+                  'ts': round((start - self.origin) * 1e6, 1),
+                  'dur': round((end - start) * 1e6, 1),
+                  'pid': self.pid, 'tid': threading.get_ident() }
+        if args:
+            event['args'] = { key: str(value) for key, value in args.items() }
+
+        with self.lock:
+            self.events.append(event)
+
+    def save(self, path):
+        """save recorded spans as a Chrome trace event file"""
+
+        with self.lock:
+            events = sorted(self.events, key=lambda event: event['ts'])
+
+        # process and thread names shown by trace viewers
+        names = [ { 'name': 'process_name', 'ph': 'M', 'pid': self.pid,
+                    'args': {'name': 'labbook'} } ]
+        for tid in sorted(set(event['tid'] for event in events)):
+            names.append({ 'name': 'thread_name', 'ph': 'M', 'pid': self.pid,
+                           'tid': tid,
+                           'args': {'name': 'main' if tid == mainTid
+                                            else 'worker ' + str(tid)} })
+
+        with open(path, 'w') as traceFile:
+            json.dump({ 'traceEvents': names + events,
+                        'displayTimeUnit': 'ms' }, traceFile)
+
+# current recorder, None when tracing is off
+recorder = None
+# thread running LabBook main function
+mainTid = threading.get_ident()
+
+def start():
+    """start recording spans"""
+
+    global recorder
+    recorder = LbkTrace()
+
+def stop(path):
+    """stop recording spans and save them in path"""
+
+    global recorder
+    if recorder is not None:
+        recorder.save(path)
+    recorder = None
+
+@contextlib.contextmanager
+def recording():
+    """record spans of enclosed block even when tracing is off, yield list
+       filled with its events once block exits"""
+
+    global recorder
+    own = recorder is None
+    if own:
+        recorder = LbkTrace()
+
+    current = recorder
+    with current.lock:
+        mark = len(current.events)
+
+    events = []
+    try:
+        yield events
+    finally:
+        with current.lock:
+            events.extend(current.events[mark:])
+        if own:
+            recorder = None
+
+@contextlib.contextmanager
+def span(name, cat='labbook', **args):
+    """record enclosed block as a span when tracing"""
+
+    if recorder is None:
+        yield
+        return
+
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        # recorder may have been stopped meanwhile
+        current = recorder
+        if current is not None:
+            current.add(name, cat, start, time.perf_counter(), args)
+
+def traced(cat='labbook'):
+    """decorator recording each call of a function as a span"""
+
+    def decorator(func):
+
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+
+            if recorder is None:
+                return func(*args, **kwargs)
+
+            with span(func.__qualname__, cat):
+                return func(*args, **kwargs)
+
+        return wrapper
+
+    return decorator
@@ -0,0 +1,295 @@
+#! /usr/local/bin/python3
+# -*- coding: utf-8 -*-
+
+import ctypes
+import ctypes.util
+import datetime
+import errno
+import os
+import select
+import struct
+import time
+
+# Change sources ============================================================= #
+
+class LbkInotify:
+    """change source based on Linux inotify, called through ctypes"""
+
+    method = 'inotify'
+
+    # event masks
+    IN_MODIFY      = 0x00000002
+    IN_CLOSE_WRITE = 0x00000008
+    IN_MOVED_FROM  = 0x00000040
+    IN_MOVED_TO    = 0x00000080
+    IN_CREATE      = 0x00000100
+    IN_DELETE      = 0x00000200
+    IN_DELETE_SELF = 0x00000400
+    IN_Q_OVERFLOW  = 0x00004000
+    IN_IGNORED     = 0x00008000
+    IN_ISDIR       = 0x40000000
+    mask = IN_CLOSE_WRITE | IN_MOVED_FROM | IN_MOVED_TO | IN_CREATE | \
+           IN_DELETE | IN_DELETE_SELF
+    # event header: watch descriptor, mask, cookie, name length
+    header = struct.Struct('iIII')
+
+    def __init__(self, cwd, dirs, files):
+        """LbkInotify class constructor, raise OSError if unavailable"""
+
+        # current working directory
+        self.cwd = cwd
+        # watched top level directories and files
+        self.dirs = set(dirs)
+        self.files = set(files)
+        # watched directories by descriptor
+        self.wds = {}
+
+        libc = ctypes.util.find_library('c')
+        self.libc = ctypes.CDLL(libc, use_errno=True)
+        if not hasattr(self.libc, 'inotify_init1'):
+            raise OSError(errno.ENOSYS, 'inotify not available')
+
+        self.fd = self.libc.inotify_init1(os.O_NONBLOCK | os.O_CLOEXEC)
+        if self.fd < 0:
+            raise OSError(ctypes.get_errno(), 'inotify_init1 failed')
+
+        try:
+            # top level files are watched through their directory
+            if self.files:
+                self.addWatch('')
+            for path in dirs:
+                self.addTree(path)
+        except OSError:
+            self.close()
+            raise
+
+    def addWatch(self, path):
+        """watch directory given relatively to cwd"""
+
+        wd = self.libc.inotify_add_watch(self.fd,
+                        os.fsencode(os.path.join(self.cwd, path)),
+                        self.mask)
+        if wd < 0:
+            raise OSError(ctypes.get_errno(), 'inotify_add_watch failed')
+        self.wds[wd] = path
+
+    def addTree(self, path):
+        """watch directory and its sub-directories, new ones included"""
+
+        if not os.path.isdir(os.path.join(self.cwd, path)):
+            return
+        for root, dirs, files in os.walk(os.path.join(self.cwd, path)):
+            self.addWatch(os.path.relpath(root, self.cwd))
+
+    def poll(self, timeout=None):
+        """wait for changes at most timeout seconds, return changed paths"""
+
+        ready = select.select([self.fd], [], [], timeout)[0]
+        if not ready:
+            return set()
+
+        changes = set()
+        while True:
+            try:
+                data = os.read(self.fd, 65536)
+            except BlockingIOError:
+                break
+
+            offset = 0
+            while offset < len(data):
+                wd, mask, cookie, length = self.header.unpack_from(data, offset)
+                offset += self.header.size
+                name = os.fsdecode(data[offset:offset+length].rstrip(b'\0'))
+                offset += length
+
+                # lost events: report whole tree as changed
+                if mask & self.IN_Q_OVERFLOW:
+                    changes.add('')
+                    continue
+                if mask & self.IN_IGNORED:
+                    self.wds.pop(wd, None)
+                    continue
+
+                parent = self.wds.get(wd)
+                if parent is None:
+                    continue
+                path = os.path.normpath(os.path.join(parent, name))
+
+                # top level directory is only watched for some files
+                if parent == '' and name not in self.files | self.dirs:
+                    continue
+                if mask & self.IN_ISDIR and mask & (self.IN_CREATE |
+                                                    self.IN_MOVED_TO):
+                    self.addTree(path)
+                changes.add(path)
+
+        return changes
+
+    def close(self):
+        """release inotify descriptor"""
+
+        if self.fd >= 0:
+            os.close(self.fd)
+            self.fd = -1
+
+class LbkPoller:
+    """change source comparing file stats at regular intervals"""
+
+    method = 'polling'
+
+    def __init__(self, cwd, dirs, files, interval=1.0):
+        """LbkPoller class constructor"""
+
+        # current working directory
+        self.cwd = cwd
+        # watched directories and top level files
+        self.dirs = dirs
+        self.files = files
+        # seconds between scans
+        self.interval = interval
+        # last scan
+        self.stats = self.scan()
+
+    def scan(self):
+        """get mtime and size of watched files"""
+
+        stats = {}
+        for name in self.files:
+            try:
+                stat = os.stat(os.path.join(self.cwd, name))
+                stats[name] = (stat.st_mtime_ns, stat.st_size)
+            except OSError:
+                pass
+
+        paths = list(self.dirs)
+        while paths:
+            path = paths.pop()
+            try:
+                with os.scandir(os.path.join(self.cwd, path)) as entries:
+                    for entry in entries:
+                        if entry.is_dir(follow_symlinks=False):
+                            paths.append(os.path.join(path, entry.name))
+                        else:
+                            stat = entry.stat()
+                            stats[os.path.join(path, entry.name)] = \
+                                (stat.st_mtime_ns, stat.st_size)
+            except OSError:
+                pass
+
+        return stats
+
+    def poll(self, timeout=None):
+        """wait for changes at most timeout seconds, return changed paths"""
+
+        deadline = None if timeout is None else time.monotonic() + timeout
+        while True:
+
+            delay = self.interval if deadline is None else \
+                    min(self.interval, max(0, deadline - time.monotonic()))
+            time.sleep(delay)
+
+            stats = self.scan()
+            changes = { path for path in set(stats) | set(self.stats)
+                        if stats.get(path) != self.stats.get(path) }
+            self.stats = stats
+
+            if changes or (deadline is not None and
+                           time.monotonic() >= deadline):
+                return changes
+
+    def close(self):
+        """nothing to release"""
+
+# Watch ====================================================================== #
+
+class LbkWatch:
+    """debounced changes of logs, templates and parameter file"""
+
+    # watched directories and files
+    dirs = ['logs', 'tpl']
+    files = ['param.lbk']
+    # files written by LabBook itself in logs
+    generated = ('header.tex',)
+
+    def __init__(self, cwd, poll=False, debounce=0.3):
+        """LbkWatch class constructor"""
+
+        # current working directory
+        self.cwd = cwd
+        # quiet delay in seconds closing a burst of changes
+        self.debounce = debounce
+
+        self.source = None
+        if not poll:
+            try:
+                self.source = LbkInotify(cwd, self.dirs, self.files)
+            except (OSError, AttributeError, TypeError):
+                self.source = None
+        if self.source is None:
+            self.source = LbkPoller(cwd, self.dirs, self.files)
+            # a burst lasts at least one scan
+            self.debounce = max(debounce, self.source.interval)
+
+        # change source name
+        self.method = self.source.method
+
+    def wait(self, timeout=None):
+        """wait for a burst of changes, return changed paths once quiet,
+           empty set on timeout"""
+
+        changes = self.source.poll(timeout)
+        if not changes:
+            return changes
+
+        while True:
+            more = self.source.poll(self.debounce)
+            if not more:
+                return changes
+            changes |= more
+
+    def classify(self, changes):
+        """split changed paths into log dates, template names and parameter
+           file change, dates being None when any entry may have changed"""
+
+        # build outputs written next to logs, compiler being loaded by
+        # builds only
+        from LbkCompiler import LbkCompiler
+        outExts = tuple(LbkCompiler.outExts)
+
+        dates, templates, param = set(), set(), False
+        for path in changes:
+
+            # lost events
+            if path in ('', '.'):
+                return None, set(os.listdir(os.path.join(self.cwd, 'tpl'))), True
+
+            parts = path.split(os.sep)
+            if parts == ['param.lbk']:
+                param = True
+
+            elif parts[0] == 'tpl' and len(parts) > 1:
+                templates.add(parts[1])
+
+            elif parts[0] == 'logs' and dates is not None:
+
+                if parts[-1] in self.generated or \
+                   parts[-1].lower().endswith(outExts):
+                    continue
+
+                # year or month directory changed as a whole
+                if len(parts) < 4:
+                    dates = None
+                    continue
+
+                try:
+                    dates.add(datetime.date(int(parts[1]), int(parts[2]),
+                                            int(parts[3])))
+                except ValueError:
+                    pass
+
+        return dates, templates, param
+
+    def close(self):
+        """release change source"""
+
+        self.source.close()